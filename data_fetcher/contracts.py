@@ -7,6 +7,7 @@ Dataclasses and functions for contract handling.
 
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 import sys
 import os
 
@@ -14,6 +15,9 @@ import os
 sys.path.insert(0, '/mnt/c/Users/krajcovic/Documents/GitHub/ATS_DataFetch')
 from src.core.data_fetcher import DeliveryDateCalculator
 
+# Stateless - one shared instance instead of one per parsed contract
+_DELIVERY_CALC = DeliveryDateCalculator()
+
 
 @dataclass
 class ContractSpec:
@@ -33,6 +37,12 @@ class RelativePeriod:
     end_date: datetime
 
 
+@lru_cache(maxsize=4096)
+def _delivery_date(tenor: str, contract: str) -> datetime:
+    """Cached delivery date for calendar-fixed tenors (not day-ahead, which depends on today)"""
+    return _DELIVERY_CALC.calc_delivery_date(tenor, contract)
+
+
 def parse_absolute_contract(contract_str: str) -> ContractSpec:
     """
     Parse absolute contract with product encoding - supports 2-3 letter market codes
@@ -67,9 +77,11 @@ def parse_absolute_contract(contract_str: str) -> ContractSpec:
     
     product = product_map[product_code]
     
-    # Calculate delivery date
-    calc = DeliveryDateCalculator()
-    delivery_date = calc.calc_delivery_date(tenor, contract)
+    # Calculate delivery date (the same contracts recur across legs and periods)
+    if tenor.lower() == 'da':
+        delivery_date = _DELIVERY_CALC.calc_delivery_date(tenor, contract)
+    else:
+        delivery_date = _delivery_date(tenor, contract)
     
     return ContractSpec(
         market=market,
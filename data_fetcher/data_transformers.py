@@ -7,7 +7,80 @@ Functions for transforming between different data formats and detecting outliers
 
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, Tuple
+
+# Unified target format column order shared by trades and orders
+TARGET_COLUMNS = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _rolling_mean_std(values: np.ndarray, window: int, min_periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Single-pass rolling mean and sample std (ddof=1), NaN-aware like pandas rolling.
+
+    Running sums use Kahan compensation so long series do not accumulate
+    floating point drift; round-off negative variance is clamped to 0.
+    """
+    n = values.shape[0]
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    s = 0.0
+    s2 = 0.0
+    c_s = 0.0
+    c_s2 = 0.0
+    count = 0
+
+    for i in range(n):
+        x = values[i]
+        if not np.isnan(x):
+            y = x - c_s
+            t = s + y
+            c_s = (t - s) - y
+            s = t
+            y = x * x - c_s2
+            t = s2 + y
+            c_s2 = (t - s2) - y
+            s2 = t
+            count += 1
+
+        if i >= window:
+            x = values[i - window]
+            if not np.isnan(x):
+                y = -x - c_s
+                t = s + y
+                c_s = (t - s) - y
+                s = t
+                y = -x * x - c_s2
+                t = s2 + y
+                c_s2 = (t - s2) - y
+                s2 = t
+                count -= 1
+
+        if count >= min_periods and count > 0:
+            mean[i] = s / count
+            if count > 1:
+                var = (s2 - s * s / count) / (count - 1)
+                std[i] = np.sqrt(var) if var > 0.0 else 0.0
+
+    return mean, std
+
+
+if NUMBA_AVAILABLE:
+    _rolling_mean_std = njit(cache=True)(_rolling_mean_std)
+
+
+def _rolling_mean_std_pandas(values: np.ndarray, window: int, min_periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """pandas rolling fallback for _rolling_mean_std when numba is not installed"""
+    if min_periods > window:
+        # No window can reach min_periods (pandas rejects this outright)
+        return np.full(values.shape[0], np.nan), np.full(values.shape[0], np.nan)
+    rolling = pd.Series(values).rolling(window, min_periods=min_periods)
+    return rolling.mean().to_numpy(), rolling.std().to_numpy()
 
 
 def transform_orders_to_target_format(orders_df: pd.DataFrame, source: str) -> pd.DataFrame:
@@ -20,19 +93,22 @@ def transform_orders_to_target_format(orders_df: pd.DataFrame, source: str) -> p
         # SpreadViewer format
         orders_df = orders_df.rename(columns={'bid': 'b_price', 'ask': 'a_price'})
     
-    # Create target format with NaN for trade-specific columns
-    target_df = pd.DataFrame(index=orders_df.index)
-    target_df['price'] = np.nan
-    target_df['volume'] = np.nan  
-    target_df['action'] = np.nan
-    target_df['broker_id'] = np.nan
-    target_df['count'] = np.nan
-    target_df['tradeid'] = np.nan
-    target_df['b_price'] = orders_df['b_price']
-    target_df['a_price'] = orders_df['a_price']
-    target_df['0'] = (orders_df['b_price'] + orders_df['a_price']) / 2  # Mid-price
-    
-    return target_df
+    # Create target format with NaN for trade-specific columns in a single
+    # constructor call (scalar NaN broadcasts; avoids per-column insertions)
+    b_price = orders_df['b_price'].to_numpy()
+    a_price = orders_df['a_price'].to_numpy()
+
+    return pd.DataFrame({
+        'price': np.nan,
+        'volume': np.nan,
+        'action': np.nan,
+        'broker_id': np.nan,
+        'count': np.nan,
+        'tradeid': np.nan,
+        'b_price': b_price,
+        'a_price': a_price,
+        '0': (b_price + a_price) * 0.5  # Mid-price
+    }, index=orders_df.index)
 
 
 def transform_trades_to_target_format(trades_df: pd.DataFrame, source: str) -> pd.DataFrame:
@@ -40,71 +116,105 @@ def transform_trades_to_target_format(trades_df: pd.DataFrame, source: str) -> p
     if trades_df.empty:
         return pd.DataFrame()
     
-    target_df = pd.DataFrame(index=trades_df.index)
-    
     if source == 'datafetcher':
         # DataFetcher format: ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid']
-        target_df['price'] = trades_df.get('price', np.nan)
-        target_df['volume'] = trades_df.get('volume', np.nan)
-        target_df['action'] = trades_df.get('action', np.nan)
-        target_df['broker_id'] = trades_df.get('broker_id', np.nan)
-        target_df['count'] = trades_df.get('count', np.nan)
-        target_df['tradeid'] = trades_df.get('tradeid', np.nan)
-        target_df['0'] = trades_df.get('price', np.nan)  # Trade price
+        price = trades_df.get('price', np.nan)
+        target_df = pd.DataFrame({
+            'price': price,
+            'volume': trades_df.get('volume', np.nan),
+            'action': trades_df.get('action', np.nan),
+            'broker_id': trades_df.get('broker_id', np.nan),
+            'count': trades_df.get('count', np.nan),
+            'tradeid': trades_df.get('tradeid', np.nan),
+            'b_price': np.nan,
+            'a_price': np.nan,
+            '0': price  # Trade price
+        }, index=trades_df.index)
         
     elif source == 'spreadviewer':
         # SpreadViewer format: ['buy', 'sell']
-        all_trades = []
-        
-        # Process buy trades
-        if 'buy' in trades_df.columns:
-            buy_trades = trades_df['buy'].dropna()
-            for idx, price in buy_trades.items():
-                all_trades.append({
-                    'timestamp': idx,
-                    'price': price,
-                    'volume': 1,  # Default volume
-                    'action': 1.0,  # Buy action
-                    'broker_id': 9999,  # Synthetic broker ID
-                    'count': 1,
-                    'tradeid': f'synth_buy_{idx}',
-                    '0': price
-                })
-        
-        # Process sell trades  
-        if 'sell' in trades_df.columns:
-            sell_trades = trades_df['sell'].dropna()
-            for idx, price in sell_trades.items():
-                all_trades.append({
-                    'timestamp': idx,
-                    'price': price,
-                    'volume': 1,  # Default volume
-                    'action': -1.0,  # Sell action
-                    'broker_id': 9999,  # Synthetic broker ID
-                    'count': 1,
-                    'tradeid': f'synth_sell_{idx}',
-                    '0': price
-                })
+        # Built column-wise as typed arrays (buy trades first, then sell trades)
+        # instead of one Python dict per trade
+        sides = []
+        for column, action in (('buy', 1.0), ('sell', -1.0)):
+            if column in trades_df.columns:
+                side_prices = trades_df[column].dropna()
+                if not side_prices.empty:
+                    sides.append((column, action, side_prices))
         
-        if all_trades:
-            target_df = pd.DataFrame(all_trades)
-            target_df.set_index('timestamp', inplace=True)
+        if sides:
+            prices = np.concatenate([side_prices.to_numpy() for _, _, side_prices in sides])
+            n_trades = len(prices)
+            target_df = pd.DataFrame({
+                'price': prices,
+                'volume': np.ones(n_trades, dtype=np.int64),  # Default volume
+                'action': np.concatenate([np.full(len(side_prices), action)
+                                          for _, action, side_prices in sides]),  # Buy 1.0 / sell -1.0
+                'broker_id': np.full(n_trades, 9999, dtype=np.int64),  # Synthetic broker ID
+                'count': np.ones(n_trades, dtype=np.int64),
+                'tradeid': [f'synth_{column}_{idx}' for column, _, side_prices in sides
+                            for idx in side_prices.index],
+                'b_price': np.nan,
+                'a_price': np.nan,
+                '0': prices
+            }, index=sides[0][2].index.append([side_prices.index for _, _, side_prices in sides[1:]]))
             target_df.index.name = None
         else:
             # Empty case
-            target_df = pd.DataFrame(columns=['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', '0'])
+            target_df = pd.DataFrame(columns=TARGET_COLUMNS)
     
-    # Add NaN for order-specific columns
-    target_df['b_price'] = np.nan
-    target_df['a_price'] = np.nan
-    
-    # Reorder columns to match target format
-    target_columns = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-    target_df = target_df.reindex(columns=target_columns)
+    else:
+        # Unknown source: keep the index, no data
+        target_df = pd.DataFrame(np.nan, index=trades_df.index, columns=TARGET_COLUMNS)
     
     return target_df
 
 
+def drop_duplicate_records(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop exact duplicate records (same timestamp and same values), keeping the first.
+    
+    Duplicates can only share a timestamp, so only rows on repeated timestamps
+    are compared column-wise instead of hashing every row.
+    """
+    repeated = df.index.duplicated(keep=False)
+    if not repeated.any():
+        return df
+    
+    keep = np.ones(len(df), dtype=bool)
+    keep[repeated] = ~df[repeated].reset_index().duplicated().to_numpy()
+    return df[keep]
+
+
+# Count/id columns of the target format; prices are kept at full precision
+STORAGE_DOWNCAST_COLUMNS = ('volume', 'action', 'broker_id', 'count')
+
+
+def downcast_for_storage(df: pd.DataFrame, columns=STORAGE_DOWNCAST_COLUMNS) -> pd.DataFrame:
+    """
+    Downcast count/id columns to 32-bit dtypes where it loses nothing.
+    
+    float64 columns become float32 only if every value round-trips exactly
+    (NaN included); int64 columns take the smallest integer dtype that fits.
+    Columns that are missing, non-numeric or would lose precision are left as is.
+    """
+    downcast = {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy()
+        if values.dtype == np.float64:
+            narrowed = values.astype(np.float32)
+            if np.array_equal(narrowed, values, equal_nan=True):
+                downcast[column] = narrowed
+        elif values.dtype == np.int64:
+            narrowed = pd.to_numeric(df[column], downcast='integer')
+            if narrowed.dtype != values.dtype:
+                downcast[column] = narrowed.to_numpy()
+    
+    return df.assign(**downcast) if downcast else df
+
+
 def detect_price_outliers(trades_df: pd.DataFrame, z_threshold: float = 5.0, 
                          window_size: int = 50, max_pct_change: float = 50.0,
                          min_time_gap_minutes: float = 60.0) -> pd.DataFrame:
@@ -126,58 +236,60 @@ def detect_price_outliers(trades_df: pd.DataFrame, z_threshold: float = 5.0,
     
     print(f"   🔍 Detecting price outliers (z_threshold={z_threshold}, window={window_size})")
     
-    # Create copy to avoid modifying original
-    df = trades_df.copy()
-    
-    # Only analyze rows with valid prices
-    price_mask = df['price'].notna() & (df['price'] > 0)
+    # Only analyze rows with valid prices (one pass over the raw array)
+    prices = trades_df['price'].to_numpy(dtype=np.float64)
+    price_mask = (prices > 0) & ~np.isnan(prices)
     if price_mask.sum() < 2:
+        # Nothing to filter - skip the copy entirely
         print(f"      ⚠️  Insufficient price data for outlier detection")
-        return df
+        return trades_df
     
-    price_data = df.loc[price_mask].copy()
-    price_data = price_data.sort_index()
+    # Work on the valid prices as plain arrays; trades normally arrive in time
+    # order, so only sort (the arrays, never the frame) when they do not
+    price_index = trades_df.index[price_mask]
+    prices = prices[price_mask]
+    if not price_index.is_monotonic_increasing:
+        order = np.argsort(price_index.values, kind='stable')
+        price_index = price_index[order]
+        prices = prices[order]
     
     # Calculate returns (percentage price changes)
-    price_data['prev_price'] = price_data['price'].shift(1)
-    price_data['price_return'] = (price_data['price'] - price_data['prev_price']) / price_data['prev_price'] * 100
+    prev_prices = np.empty_like(prices)
+    prev_prices[0] = np.nan
+    prev_prices[1:] = prices[:-1]
+    price_returns = (prices - prev_prices) / prev_prices * 100
     
     # Calculate time gaps between trades (in minutes)
-    price_data['time_gap'] = price_data.index.to_series().diff().dt.total_seconds() / 60
+    time_gaps = np.empty_like(prices)
+    time_gaps[0] = np.nan
+    time_gaps[1:] = np.diff(price_index.values) / np.timedelta64(1, 'm')
     
-    # Rolling volatility estimation
-    price_data['rolling_std'] = price_data['price_return'].rolling(
-        window=min(window_size, len(price_data)), min_periods=5
-    ).std()
+    # Rolling volatility estimation (mean and std from a single helper call)
+    window = min(window_size, len(prices))
+    rolling_mean_std = _rolling_mean_std if NUMBA_AVAILABLE else _rolling_mean_std_pandas
+    rolling_mean, rolling_std = rolling_mean_std(price_returns, window, 5)
     
     # Calculate z-scores
-    price_data['rolling_mean'] = price_data['price_return'].rolling(
-        window=min(window_size, len(price_data)), min_periods=5
-    ).mean()
-    
-    price_data['z_score'] = np.abs(
-        (price_data['price_return'] - price_data['rolling_mean']) / price_data['rolling_std']
-    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.abs((price_returns - rolling_mean) / rolling_std)
     
     # Adjust z-score threshold for large time gaps
     # If trades are far apart, allow larger price moves
-    time_gap_factor = np.clip(price_data['time_gap'] / min_time_gap_minutes, 1.0, 3.0)
+    time_gap_factor = np.clip(time_gaps / min_time_gap_minutes, 1.0, 3.0)
     adjusted_z_threshold = z_threshold * time_gap_factor
     
-    # Create outlier flags
-    outliers = pd.Series(False, index=price_data.index)
-    
+    # Create outlier flags as plain ndarray masks
     # Flag 1: Z-score outliers (after sufficient history)
-    z_outliers = (price_data['z_score'] > adjusted_z_threshold) & price_data['rolling_std'].notna()
+    z_outliers = (z_scores > adjusted_z_threshold) & ~np.isnan(rolling_std)
     
     # Flag 2: Hard percentage change limits
-    pct_outliers = np.abs(price_data['price_return']) > max_pct_change
+    pct_outliers = np.abs(price_returns) > max_pct_change
     
     # Combine flags
     outliers = z_outliers | pct_outliers
     
     # Statistics
-    total_trades = len(price_data)
+    total_trades = len(prices)
     z_score_outliers = z_outliers.sum()
     pct_outliers_count = pct_outliers.sum()
     total_outliers = outliers.sum()
@@ -190,16 +302,18 @@ def detect_price_outliers(trades_df: pd.DataFrame, z_threshold: float = 5.0,
     
     if total_outliers > 0:
         print(f"      🚫 Outlier examples:")
-        outlier_samples = price_data[outliers].head(3)
-        for idx, row in outlier_samples.iterrows():
-            print(f"         {idx}: {row['prev_price']:.2f} → {row['price']:.2f} "
-                  f"({row['price_return']:+.1f}%, z={row['z_score']:.1f})")
+        sample = np.flatnonzero(outliers)[:3]
+        for idx, prev_price, price, price_return, z_score in zip(
+                price_index[sample], prev_prices[sample], prices[sample],
+                price_returns[sample], z_scores[sample]):
+            print(f"         {idx}: {prev_price:.2f} → {price:.2f} "
+                  f"({price_return:+.1f}%, z={z_score:.1f})")
     
-    # Filter out outliers from original DataFrame
-    outlier_indices = price_data[outliers].index
-    filtered_df = df.drop(outlier_indices)
+    # Filter out outliers from original DataFrame (drop returns a new frame)
+    outlier_indices = price_index[outliers]
+    filtered_df = trades_df.drop(outlier_indices)
     
-    print(f"      ✅ Price outlier filtering: {len(df)} → {len(filtered_df)} trades "
+    print(f"      ✅ Price outlier filtering: {len(trades_df)} → {len(filtered_df)} trades "
           f"({total_outliers} outliers removed)")
     
-    return filtered_df
\ No newline at end of file
+    return filtered_df
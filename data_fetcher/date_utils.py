@@ -6,27 +6,26 @@ Functions for date calculations, business day logic, and temporal transitions.
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import List, Tuple
+import numpy as np
 import pandas as pd
 
 from .contracts import ContractSpec, RelativePeriod
 
+# (month, day) of the last calendar day of each quarter, indexed by quarter - 1
+QUARTER_END_MONTH_DAY = [(3, 31), (6, 30), (9, 30), (12, 31)]
+
+def _month_last_business_days(months: np.ndarray) -> np.ndarray:
+    """Last business day (datetime64[D]) of each datetime64[M] month"""
+    month_ends = (months + 1).astype('datetime64[D]') - 1
+    return np.busday_offset(month_ends, 0, roll='backward')
+
 
 def calculate_last_business_day(year: int, month: int) -> datetime:
     """Calculate last business day of a month"""
-    # Get last day of month
-    if month == 12:
-        next_month = datetime(year + 1, 1, 1)
-    else:
-        next_month = datetime(year, month + 1, 1)
-    
-    last_day = next_month - timedelta(days=1)
-    
-    # Move backwards to find last business day
-    while last_day.weekday() > 4:  # 5=Saturday, 6=Sunday
-        last_day -= timedelta(days=1)
-    
-    return last_day
+    month = np.datetime64(f'{year:04d}-{month:02d}', 'M')
+    return _month_last_business_days(month).astype('datetime64[us]').item()
 
 
 def calculate_transition_dates(start_date: datetime, end_date: datetime, n_s: int = 3) -> List[Tuple[datetime, datetime, bool]]:
@@ -38,46 +37,35 @@ def calculate_transition_dates(start_date: datetime, end_date: datetime, n_s: in
     
     Returns list of (period_start, period_end, is_transition_period) tuples
     """
-    periods = []
-    current_date = start_date
+    start_date = pd.Timestamp(start_date).to_pydatetime()
+    end_date = pd.Timestamp(end_date).to_pydatetime()
     
-    while current_date <= end_date:
-        year, month = current_date.year, current_date.month
-        
-        # Calculate last business day of current month
-        last_bday = calculate_last_business_day(year, month)
-        
-        # Calculate transition point (last_bday - n_s + 1 business days)
-        transition_start = last_bday
-        for _ in range(n_s - 1):
-            transition_start -= timedelta(days=1)
-            while transition_start.weekday() > 4:  # Skip weekends
-                transition_start -= timedelta(days=1)
-        
-        # Calculate end of month 
-        if month == 12:
-            next_month_start = datetime(year + 1, 1, 1)
-        else:
-            next_month_start = datetime(year, month + 1, 1)
-        month_end = next_month_start - timedelta(days=1)
+    # All months touched by the range, with their month-level dates computed in
+    # bulk by NumPy's business day functions
+    months = np.arange(np.datetime64(start_date, 'M'), np.datetime64(end_date, 'M') + 1)
+    last_bdays = _month_last_business_days(months)
+    
+    # Transition point (last_bday - n_s + 1 business days)
+    transition_starts = np.busday_offset(last_bdays, -max(n_s - 1, 0))
+    month_ends = (months + 1).astype('datetime64[D]') - 1
+    
+    periods = []
+    for month_start, transition_start, month_end in zip(
+            months.astype('datetime64[us]').tolist(), transition_starts.astype('datetime64[us]').tolist(),
+            month_ends.astype('datetime64[us]').tolist()):
+        # Clip against the requested range: the first month starts at start_date
+        current_date = max(month_start, start_date)
+        early_period_end = min(transition_start - timedelta(days=1), end_date)
+        late_period_start = max(transition_start, current_date)
+        late_period_end = min(month_end, end_date)
         
         # Period 1: Early month (normal relative counting)
-        early_period_end = min(transition_start - timedelta(days=1), end_date)
         if current_date <= early_period_end:
             periods.append((current_date, early_period_end, False))  # Not transition period
         
         # Period 2: Late month (next month's relative counting) 
-        late_period_start = max(transition_start, current_date)
-        late_period_end = min(month_end, end_date)
         if late_period_start <= late_period_end:
             periods.append((late_period_start, late_period_end, True))  # Is transition period
-        
-        # Move to next month
-        current_date = next_month_start
-        
-        # If we've processed past end_date, break
-        if current_date > end_date:
-            break
     
     return periods
 
@@ -143,26 +131,15 @@ def convert_absolute_to_relative_periods(contract_spec: ContractSpec,
         ref_year = middle_date.year
         
         # Check if middle date is in transition using DataFetcher logic
-        if ref_quarter == 1:
-            quarter_end = datetime(ref_year, 3, 31)
-        elif ref_quarter == 2:
-            quarter_end = datetime(ref_year, 6, 30)
-        elif ref_quarter == 3:
-            quarter_end = datetime(ref_year, 9, 30)
-        else:  # Q4
-            quarter_end = datetime(ref_year, 12, 31)
+        end_month, end_day = QUARTER_END_MONTH_DAY[ref_quarter - 1]
+        quarter_end = datetime(ref_year, end_month, end_day)
         
-        # Find last business day of quarter
-        last_bday = quarter_end
-        while last_bday.weekday() > 4:
-            last_bday -= timedelta(days=1)
-        
-        # Calculate transition start
-        transition_start = last_bday
-        for _ in range(n_s - 1):
-            transition_start -= timedelta(days=1)
-            while transition_start.weekday() > 4:
-                transition_start -= timedelta(days=1)
+        # Last business day of quarter, and the transition start n_s - 1
+        # business days before it
+        last_bday = np.busday_offset(np.datetime64(quarter_end, 'D'), 0, roll='backward')
+        transition_start = np.busday_offset(last_bday, -max(n_s - 1, 0))
+        last_bday = last_bday.astype('datetime64[us]').item()
+        transition_start = transition_start.astype('datetime64[us]').item()
         
         # Check if middle date is in transition - CORRECTED LOGIC
         # User observation: June 26 should be q_1 when n_s=3
@@ -170,13 +147,9 @@ def convert_absolute_to_relative_periods(contract_spec: ContractSpec,
         in_transition = transition_start.date() <= middle_date.date() <= last_bday.date()
         
         if in_transition:
-            # Use NEXT quarter perspective for entire period
-            if ref_quarter == 4:
-                calc_quarter = 1
-                calc_year = ref_year + 1
-            else:
-                calc_quarter = ref_quarter + 1
-                calc_year = ref_year
+            # Use NEXT quarter perspective for entire period (Q4 rolls into next year's Q1)
+            calc_quarter = (ref_quarter % 4) + 1
+            calc_year = ref_year + ref_quarter // 4
         else:
             # Use CURRENT quarter perspective for entire period
             calc_quarter = ref_quarter
@@ -234,33 +207,45 @@ def convert_absolute_to_relative_periods(contract_spec: ContractSpec,
     return periods
 
 
-def calculate_synchronized_product_dates(dates: pd.DatetimeIndex, tenors_list: List[str], 
-                                       tn1_list: List[int], n_s: int = 3) -> List[pd.DatetimeIndex]:
+# Relative-period shift frequency for standard tenors, by first letter:
+# quarterly, monthly and yearly start
+_TENOR_SHIFT_FREQ = {'q': 'QS', 'm': 'MS', 'y': 'YS'}
+
+
+def _standard_tenor_freq(tenor: str) -> str:
+    """Relative-period shift frequency for monthly/quarterly/yearly style tenors"""
+    return _TENOR_SHIFT_FREQ.get(tenor[:1]) or tenor.upper() + 'S'  # Fallback for other tenors
+
+
+@lru_cache(maxsize=4096)
+def _synchronized_product_dates(dates_key: bytes, tz, freq, tenors: Tuple[str, ...], tns: Tuple[int, ...],
+                                n_s: int) -> Tuple[pd.DatetimeIndex, pd.DatetimeIndex, Tuple[pd.DatetimeIndex, ...]]:
     """
-    Calculate product dates with CORRECTED n_s logic
+    Cached core of calculate_synchronized_product_dates.
     
-    CORRECT n_s logic:
-    - n_s denotes how many business days FORWARD from each date should be shifted to get product start date
-    - Reverse logic: for start date of absolute period, get relative periods for each date, 
-      then shift BACK by n_s to get the original reference date
-    - Filter out relative period 0, keep only 1 and above
+    Keyed on the raw int64 dates (plus tz and freq) so repeated date ranges,
+    tenors and periods skip the offset arithmetic. Returns the (possibly
+    regenerated) dates, the n_s-shifted dates (None if never computed) and one
+    product date index per tenor.
     """
-    print(f"   🔧 Using CORRECTED n_s logic: forward shift to product start date")
-    print(f"      📅 Input dates: {dates[0]} to {dates[-1]} ({len(dates)} business days)")
-    print(f"      📊 Tenors: {tenors_list}, Periods: {tn1_list}, n_s: {n_s}")
+    dates = pd.DatetimeIndex(np.frombuffer(dates_key, dtype=np.int64).view('M8[ns]'))
+    if tz is not None:
+        dates = dates.tz_localize('UTC').tz_convert(tz)
     
-    product_dates_list = []
+    # Shift forward by n_s business days once - identical for every tenor below.
+    # A freq-less index keeps its raw dates until the first standard tenor
+    # regenerates it as a business-day range (original SpreadViewer behaviour)
+    shifted_dates = None
+    if freq is not None:
+        dates = pd.DatetimeIndex(dates, freq=freq)
+        shifted_dates = dates + n_s * dates.freq
     
-    for tenor, tn in zip(tenors_list, tn1_list):
-        print(f"      🔄 Processing tenor {tenor}, relative period {tn}")
-        
+    product_dates = []
+    for tenor, tn in zip(tenors, tns):
         # Filter out relative period 0 - only keep 1 and above
         if tn <= 0:
-            print(f"      ⚠️  Skipping relative period {tn} (must be >= 1)")
-            product_dates_list.append(pd.DatetimeIndex([]))
-            continue
-        
-        if tenor in ['da', 'd']:
+            pd_result = pd.DatetimeIndex([])
+        elif tenor in ['da', 'd']:
             # Daily contracts
             pd_result = dates.shift(1, freq='B')
         elif tenor == 'w':
@@ -272,48 +257,65 @@ def calculate_synchronized_product_dates(dates: pd.DatetimeIndex, tenors_list: L
         elif tenor == 'm1q':
             # M1Q contracts
             pd_result = dates.shift(tn, freq='QS')
-        elif tenor in ['sum']:
-            # Summer contracts - use original SpreadViewer logic
-            shifted_dates = dates + n_s * dates.freq
-            pd_result = shifted_dates.shift(tn, freq='AS-Apr')
-        elif tenor in ['win']:
-            # Winter contracts - use original SpreadViewer logic
-            shifted_dates = dates + n_s * dates.freq
-            pd_result = shifted_dates.shift(tn, freq='AS-Oct')
+        elif tenor in ['sum', 'win']:
+            # Summer/winter contracts - use original SpreadViewer logic
+            if shifted_dates is None:
+                raise ValueError(f"Tenor '{tenor}' needs dates with a business-day freq "
+                                 f"(or a preceding standard tenor), got a freq-less index")
+            pd_result = shifted_dates.shift(tn, freq='AS-Apr' if tenor == 'sum' else 'AS-Oct')
         else:
             # Standard contracts (monthly 'm', quarterly 'q', yearly 'y')
             # CORRECTED LOGIC: Use original SpreadViewer approach
             # n_s business days forward + relative period shift
-            
-            # Step 1: Shift forward by n_s business days
-            # Ensure dates have business day frequency for proper calculation
-            if dates.freq is None:
+            if shifted_dates is None:
                 dates = pd.date_range(start=dates[0], end=dates[-1], freq='B')
-            shifted_dates = dates + n_s * dates.freq
+                shifted_dates = dates + n_s * dates.freq
+            pd_result = shifted_dates.shift(tn, freq=_standard_tenor_freq(tenor))
+        product_dates.append(pd_result)
+    
+    return dates, shifted_dates, tuple(product_dates)
+
+
+def calculate_synchronized_product_dates(dates: pd.DatetimeIndex, tenors_list: List[str], 
+                                       tn1_list: List[int], n_s: int = 3) -> List[pd.DatetimeIndex]:
+    """
+    Calculate product dates with CORRECTED n_s logic
+    
+    CORRECT n_s logic:
+    - n_s denotes how many business days FORWARD from each date should be shifted to get product start date
+    - Reverse logic: for start date of absolute period, get relative periods for each date, 
+      then shift BACK by n_s to get the original reference date
+    - Filter out relative period 0, keep only 1 and above
+    
+    Results are memoized on (dates, tenors, periods, n_s); the progress output
+    is printed on every call.
+    """
+    print(f"   🔧 Using CORRECTED n_s logic: forward shift to product start date")
+    print(f"      📅 Input dates: {dates[0]} to {dates[-1]} ({len(dates)} business days)")
+    print(f"      📊 Tenors: {tenors_list}, Periods: {tn1_list}, n_s: {n_s}")
+    
+    dates, shifted_dates, product_dates = _synchronized_product_dates(
+        dates.asi8.tobytes(), dates.tz, dates.freq, tuple(tenors_list), tuple(tn1_list), n_s)
+    
+    for tenor, tn, pd_result in zip(tenors_list, tn1_list, product_dates):
+        print(f"      🔄 Processing tenor {tenor}, relative period {tn}")
+        
+        if tn <= 0:
+            print(f"      ⚠️  Skipping relative period {tn} (must be >= 1)")
+            continue
+        
+        if tenor not in ('da', 'd', 'w', 'dec', 'm1q', 'sum', 'win'):
             print(f"         📅 Step 1: Forward shift by {n_s} business days")
             print(f"         📅 Original: {dates[0].strftime('%Y-%m-%d')} → Shifted: {shifted_dates[0].strftime('%Y-%m-%d')}")
-            
-            # Step 2: Apply relative period shift
-            if tenor.startswith('q') or tenor == 'q':
-                pandas_freq = 'QS'  # Quarterly start
-            elif tenor.startswith('m') or tenor == 'm':
-                pandas_freq = 'MS'  # Monthly start  
-            elif tenor.startswith('y') or tenor == 'y':
-                pandas_freq = 'YS'  # Yearly start
-            else:
-                pandas_freq = tenor.upper() + 'S'  # Fallback for other tenors
-            
-            pd_result = shifted_dates.shift(tn, freq=pandas_freq)
-            print(f"         📅 Step 2: Relative period shift by {tn} {pandas_freq}")
+            print(f"         📅 Step 2: Relative period shift by {tn} {_standard_tenor_freq(tenor)}")
             print(f"         📅 Final result: {pd_result[0].strftime('%Y-%m-%d')}")
         
-        product_dates_list.append(pd_result)
         print(f"      ✅ Tenor {tenor}, period {tn}: {len(pd_result)} dates calculated")
         
         # Debug output for first few dates
         if len(pd_result) > 0:
-            sample_dates = pd_result[:min(3, len(pd_result))]
-            print(f"         📅 Sample results: {[d.strftime('%Y-%m-%d') for d in sample_dates]}")
+            sample_dates = pd_result[:3].strftime('%Y-%m-%d').tolist()
+            print(f"         📅 Sample results: {sample_dates}")
     
     print(f"   ✅ CORRECTED product_dates calculation completed")
-    return product_dates_list
\ No newline at end of file
+    return list(product_dates)
\ No newline at end of file
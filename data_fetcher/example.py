@@ -101,6 +101,9 @@ def main():
         import traceback
         traceback.print_exc()
         return False
+    
+    finally:
+        orchestrator.close()
 
 
 if __name__ == "__main__":
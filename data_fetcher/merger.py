@@ -5,73 +5,210 @@ Data Merging and Unification
 Advanced merging algorithms for combining real and synthetic spread data.
 """
 
+import logging
+
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from .validators import BidAskValidator
 from .data_transformers import (
+    TARGET_COLUMNS,
     transform_orders_to_target_format,
     transform_trades_to_target_format,
+    drop_duplicate_records,
     detect_price_outliers
 )
 
+logger = logging.getLogger(__name__)
+
+# Columns carried through the stage 3 order merge
+_ORDER_COLUMNS = ['b_price', 'a_price']
+
+# Shared default for missing spread_orders/spread_trades keys; only ever read
+_EMPTY_FRAME = pd.DataFrame()
+
+
+def format_spread_data(spread_data: Dict, source: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Transform a source's raw spread orders and trades to target format.
+    
+    Callers feeding the same source to create_unified_* and merge_spread_data
+    can format it once and pass the result to both.
+    """
+    orders = spread_data.get('spread_orders', _EMPTY_FRAME)
+    trades = spread_data.get('spread_trades', _EMPTY_FRAME)
+    return (transform_orders_to_target_format(orders, source),
+            transform_trades_to_target_format(trades, source))
+
+
+def _assemble_unified(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate target-format frames into one timestamp-sorted frame.
+    
+    The concat is the only full copy; sorting and column reordering are
+    skipped when the result is already in timestamp and target column order.
+    Ties on a timestamp keep frame order (trades before orders).
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=TARGET_COLUMNS)
+    
+    # Each frame is a time-ordered run, so a stable merge sort is near linear
+    unified_data = pd.concat(frames, axis=0)
+    if not unified_data.index.is_monotonic_increasing:
+        unified_data = unified_data.sort_index(kind='mergesort')
+    if not unified_data.columns.equals(pd.Index(TARGET_COLUMNS)):
+        unified_data = unified_data.reindex(columns=TARGET_COLUMNS)
+    
+    return unified_data
+
+
+def _sorted_by_time(orders: pd.DataFrame) -> pd.DataFrame:
+    """Sort by timestamp only when needed (reindex forward-fill needs a sorted source)"""
+    return orders if orders.index.is_monotonic_increasing else orders.sort_index()
+
+
+def _finalize_merged_orders(merged_orders: pd.DataFrame) -> pd.DataFrame:
+    """Add the mid-price, drop rows with neither bid nor ask and restore target column order"""
+    b_price = merged_orders['b_price'].to_numpy()
+    a_price = merged_orders['a_price'].to_numpy()
+    merged_orders['0'] = (b_price + a_price) * 0.5
+    
+    # Positional keep-mask instead of dropna's aligned Series machinery
+    keep = ~(np.isnan(b_price) & np.isnan(a_price))
+    if not keep.all():
+        merged_orders = merged_orders.iloc[keep]
+    return merged_orders.reindex(columns=TARGET_COLUMNS)
+
+
+def _stage3_both(real_orders: pd.DataFrame, synthetic_orders: pd.DataFrame) -> pd.DataFrame:
+    """Best bid/ask across both order sources on their union timeline"""
+    real_orders = _sorted_by_time(real_orders)[_ORDER_COLUMNS]
+    synthetic_orders = _sorted_by_time(synthetic_orders)[_ORDER_COLUMNS]
+    
+    # Union timeline with one sort + dedup
+    union_timestamps = pd.DatetimeIndex(np.unique(np.concatenate([real_orders.index.values,
+                                                                  synthetic_orders.index.values])))
+    
+    # Resample and forward fill (gaps inside a source are filled on the
+    # source itself, new timestamps by the reindex)
+    real_resampled = real_orders.ffill().reindex(union_timestamps, method='ffill', copy=False)
+    synthetic_resampled = synthetic_orders.ffill().reindex(union_timestamps, method='ffill', copy=False)
+    
+    # fmax/fmin ignore NaN, so one side missing keeps the other
+    merged_orders = pd.DataFrame({
+        'b_price': np.fmax(real_resampled['b_price'].to_numpy(dtype=np.float64),
+                           synthetic_resampled['b_price'].to_numpy(dtype=np.float64)),
+        'a_price': np.fmin(real_resampled['a_price'].to_numpy(dtype=np.float64),
+                           synthetic_resampled['a_price'].to_numpy(dtype=np.float64))
+    }, index=union_timestamps)
+    
+    return _finalize_merged_orders(merged_orders)
+
+
+def _stage3_single(orders: pd.DataFrame) -> pd.DataFrame:
+    """Bid/ask of a single order source - its own index is the timeline, so forward fill is enough"""
+    merged_orders = _sorted_by_time(orders)[_ORDER_COLUMNS].astype(np.float64, copy=False).ffill()
+    return _finalize_merged_orders(merged_orders)
+
+
+def _stage3_real_only(real_orders: pd.DataFrame, synthetic_orders: pd.DataFrame) -> pd.DataFrame:
+    """Only real orders available"""
+    return _stage3_single(real_orders)
+
 
-def merge_spread_data(real_spread_data: Dict, synthetic_spread_data: Dict) -> Dict:
+def _stage3_synthetic_only(real_orders: pd.DataFrame, synthetic_orders: pd.DataFrame) -> pd.DataFrame:
+    """Only synthetic orders available"""
+    return _stage3_single(synthetic_orders)
+
+
+# Stage 3 order merge, indexed by has_real_orders * 2 + has_synthetic_orders
+_STAGE3 = [None, _stage3_synthetic_only, _stage3_real_only, _stage3_both]
+
+
+def merge_spread_data(real_spread_data: Dict, synthetic_spread_data: Dict,
+                      real_formatted: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None,
+                      synthetic_formatted: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None) -> Dict:
     """
     Enhanced three-stage unified DataFrame merging algorithm:
     1. Transform all data to target format
     2. Merge trades (union)  
     3. Merge orders (best bid/ask)
     4. Final union merge: trades + orders → single unified DataFrame
+    
+    real_formatted/synthetic_formatted are optional format_spread_data results
+    for the same inputs, which skip stage 1 for that source.
     """
-    print("🔄 Merging real and synthetic spread data (unified pipeline)...")
+    logger.debug("Merging real and synthetic spread data (unified pipeline)")
     
     # Extract raw data
-    real_orders = real_spread_data.get('spread_orders', pd.DataFrame())
-    real_trades = real_spread_data.get('spread_trades', pd.DataFrame())
-    synthetic_orders = synthetic_spread_data.get('spread_orders', pd.DataFrame())
-    synthetic_trades = synthetic_spread_data.get('spread_trades', pd.DataFrame())
+    real_orders = real_spread_data.get('spread_orders', _EMPTY_FRAME)
+    real_trades = real_spread_data.get('spread_trades', _EMPTY_FRAME)
+    synthetic_orders = synthetic_spread_data.get('spread_orders', _EMPTY_FRAME)
+    synthetic_trades = synthetic_spread_data.get('spread_trades', _EMPTY_FRAME)
+    source_counts = {
+        'real_trades': len(real_trades),
+        'real_orders': len(real_orders),
+        'synthetic_trades': len(synthetic_trades),
+        'synthetic_orders': len(synthetic_orders)
+    }
+    
+    if not any(source_counts.values()):
+        # Nothing to merge - skip transforms, validation and both merge stages
+        logger.debug("No real or synthetic data to merge")
+        return {
+            'unified_spread_data': pd.DataFrame(columns=TARGET_COLUMNS),
+            'method': 'unified_real_synthetic_merged',
+            'source_stats': {**source_counts, 'merged_trades': 0, 'merged_orders': 0, 'unified_total': 0}
+        }
     
     # Stage 1: Transform all data to target format
-    print("   🔄 Stage 1: Transforming data to target format")
+    logger.debug("Stage 1: Transforming data to target format")
     
-    real_orders_formatted = transform_orders_to_target_format(real_orders, 'datafetcher')
-    real_trades_formatted = transform_trades_to_target_format(real_trades, 'datafetcher')
-    synthetic_orders_formatted = transform_orders_to_target_format(synthetic_orders, 'spreadviewer')
-    synthetic_trades_formatted = transform_trades_to_target_format(synthetic_trades, 'spreadviewer')
+    real_orders_formatted, real_trades_formatted = (
+        real_formatted or format_spread_data(real_spread_data, 'datafetcher'))
+    synthetic_orders_formatted, synthetic_trades_formatted = (
+        synthetic_formatted or format_spread_data(synthetic_spread_data, 'spreadviewer'))
     
-    print(f"      ✅ Formatted: {len(real_orders_formatted)} real orders, {len(real_trades_formatted)} real trades")
-    print(f"      ✅ Formatted: {len(synthetic_orders_formatted)} synthetic orders, {len(synthetic_trades_formatted)} synthetic trades")
+    logger.debug("Formatted: %d real orders, %d real trades", len(real_orders_formatted), len(real_trades_formatted))
+    logger.debug("Formatted: %d synthetic orders, %d synthetic trades",
+                 len(synthetic_orders_formatted), len(synthetic_trades_formatted))
     
     # Stage 1.5: Validate bid-ask spreads (filter negative spreads)
-    print("   🔍 Stage 1.5: Validating bid-ask spreads")
+    logger.debug("Stage 1.5: Validating bid-ask spreads")
     validator = BidAskValidator(strict_mode=True, log_filtered=True)
     
     # Validate orders from both sources
     real_orders_formatted = validator.validate_orders(real_orders_formatted, "DataFetcher")
     synthetic_orders_formatted = validator.validate_orders(synthetic_orders_formatted, "SpreadViewer")
     
+    # Presence flags (after validation, which can filter an order source empty)
+    has_real_orders, has_real_trades, has_synthetic_orders, has_synthetic_trades = (
+        not df.empty for df in (real_orders_formatted, real_trades_formatted,
+                                synthetic_orders_formatted, synthetic_trades_formatted)
+    )
+    
     # Log validation summary
     stats = validator.get_stats()
     if stats['total_processed'] > 0:
-        print(f"      📊 Validation summary: {stats['filtered_count']}/{stats['total_processed']} "
-              f"negative spreads filtered ({stats['filter_rate']:.1f}%)")
+        logger.debug("Validation summary: %d/%d negative spreads filtered (%.1f%%)",
+                     stats['filtered_count'], stats['total_processed'], stats['filter_rate'])
     
     # Stage 2: Merge trades (simple union)
-    print("   📊 Stage 2: Merging trades (union)")
-    merged_trades = pd.DataFrame()
-    
-    if not real_trades_formatted.empty:
-        merged_trades = pd.concat([merged_trades, real_trades_formatted], axis=0)
-    if not synthetic_trades_formatted.empty:
-        merged_trades = pd.concat([merged_trades, synthetic_trades_formatted], axis=0)
-    
-    if not merged_trades.empty:
-        merged_trades = merged_trades.sort_index().drop_duplicates()
+    logger.debug("Stage 2: Merging trades (union)")
+    trade_frames = [df for df, present in ((real_trades_formatted, has_real_trades),
+                                           (synthetic_trades_formatted, has_synthetic_trades)) if present]
+    merged_trades = pd.concat(trade_frames, axis=0, copy=False) if trade_frames else pd.DataFrame()
+    
+    if trade_frames:
+        # Both sources are time-ordered runs, so a stable merge sort is near linear
+        merged_trades = merged_trades.sort_index(kind='mergesort')
+        
+        merged_trades = drop_duplicate_records(merged_trades)
         
         # Apply price outlier detection to merged trades
-        print("   🔍 Stage 2.5: Price outlier detection on merged trades")
+        logger.debug("Stage 2.5: Price outlier detection on merged trades")
         merged_trades = detect_price_outliers(
             merged_trades, 
             z_threshold=5.0,      # Conservative threshold
@@ -80,141 +217,61 @@ def merge_spread_data(real_spread_data: Dict, synthetic_spread_data: Dict) -> Di
             min_time_gap_minutes=60.0  # Time gap adjustment
         )
     
-    print(f"      ✅ Merged trades (after outlier filtering): {len(merged_trades)} records")
+    logger.debug("Merged trades (after outlier filtering): %d records", len(merged_trades))
     
     # Stage 3: Merge orders (best bid/ask selection)
-    print("   🎯 Stage 3: Merging orders (best bid/ask selection)")
-    merged_orders = pd.DataFrame()
-    
-    if not real_orders_formatted.empty or not synthetic_orders_formatted.empty:
-        # Create union timeline
-        union_timestamps = pd.Index([])
-        if not real_orders_formatted.empty:
-            union_timestamps = union_timestamps.union(real_orders_formatted.index)
-        if not synthetic_orders_formatted.empty:
-            union_timestamps = union_timestamps.union(synthetic_orders_formatted.index)
-        
-        if len(union_timestamps) > 0:
-            # Resample and forward fill
-            if not real_orders_formatted.empty:
-                real_resampled = real_orders_formatted.reindex(union_timestamps).ffill()
-            else:
-                # Create empty DataFrame with target columns
-                target_cols = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-                real_resampled = pd.DataFrame(index=union_timestamps, columns=target_cols)
-                
-            if not synthetic_orders_formatted.empty:
-                synthetic_resampled = synthetic_orders_formatted.reindex(union_timestamps).ffill()
-            else:
-                # Create empty DataFrame with target columns
-                target_cols = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-                synthetic_resampled = pd.DataFrame(index=union_timestamps, columns=target_cols)
-            
-            # Initialize merged orders DataFrame
-            merged_orders = pd.DataFrame(index=union_timestamps)
-            target_cols = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-            for col in target_cols:
-                merged_orders[col] = np.nan
-            
-            # Best bid/ask selection
-            if not real_resampled.empty and not synthetic_resampled.empty:
-                # Both sources available - best bid/ask selection
-                merged_orders['b_price'] = np.maximum(
-                    real_resampled['b_price'].fillna(-np.inf),
-                    synthetic_resampled['b_price'].fillna(-np.inf)
-                )
-                merged_orders['b_price'] = merged_orders['b_price'].replace(-np.inf, np.nan)
-                
-                merged_orders['a_price'] = np.minimum(
-                    real_resampled['a_price'].fillna(np.inf),
-                    synthetic_resampled['a_price'].fillna(np.inf)
-                )
-                merged_orders['a_price'] = merged_orders['a_price'].replace(np.inf, np.nan)
-            elif not real_resampled.empty:
-                # Only real data
-                merged_orders['b_price'] = real_resampled['b_price']
-                merged_orders['a_price'] = real_resampled['a_price']
-            elif not synthetic_resampled.empty:
-                # Only synthetic data
-                merged_orders['b_price'] = synthetic_resampled['b_price']
-                merged_orders['a_price'] = synthetic_resampled['a_price']
-            
-            # Calculate mid-price for '0' column
-            merged_orders['0'] = (merged_orders['b_price'] + merged_orders['a_price']) / 2
-            
-            # Drop rows where both bid and ask are NaN
-            merged_orders = merged_orders.dropna(subset=['b_price', 'a_price'], how='all')
-    
-    print(f"      ✅ Merged orders: {len(merged_orders)} records")
+    logger.debug("Stage 3: Merging orders (best bid/ask selection)")
+    stage3 = _STAGE3[has_real_orders * 2 + has_synthetic_orders]
+    merged_orders = stage3(real_orders_formatted, synthetic_orders_formatted) if stage3 else pd.DataFrame()
     
-    # Stage 4: Final union merge (trades + orders → unified DataFrame)
-    print("   🎉 Stage 4: Final union merge (trades + orders → unified DataFrame)")
+    logger.debug("Merged orders: %d records", len(merged_orders))
     
-    unified_data = pd.DataFrame()
-    if not merged_trades.empty:
-        unified_data = pd.concat([unified_data, merged_trades], axis=0)
-    if not merged_orders.empty:
-        unified_data = pd.concat([unified_data, merged_orders], axis=0)
+    # Stage 4: Final union merge (trades + orders → unified DataFrame)
+    logger.debug("Stage 4: Final union merge (trades + orders -> unified DataFrame)")
     
-    if not unified_data.empty:
-        # Sort by timestamp and ensure target column order
-        unified_data = unified_data.sort_index()
-        target_columns = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-        unified_data = unified_data.reindex(columns=target_columns)
+    unified_data = _assemble_unified([merged_trades, merged_orders])
     
-    print(f"      ✅ Unified dataset: {len(unified_data)} total records (trades + orders)")
+    n_unified = len(unified_data)
+    logger.debug("Unified dataset: %d total records (trades + orders)", n_unified)
     
     # Create result with unified structure
     result = {
         'unified_spread_data': unified_data,
         'method': 'unified_real_synthetic_merged',
         'source_stats': {
-            'real_trades': len(real_trades),
-            'real_orders': len(real_orders),
-            'synthetic_trades': len(synthetic_trades),
-            'synthetic_orders': len(synthetic_orders),
+            **source_counts,
             'merged_trades': len(merged_trades),
             'merged_orders': len(merged_orders),
-            'unified_total': len(unified_data)
+            'unified_total': n_unified
         }
     }
     
-    print(f"   ✅ Unified spread dataset created: {len(unified_data)} total records")
+    logger.debug("Unified spread dataset created: %d total records", n_unified)
     
     return result
 
 
-def create_unified_spreadviewer_data(synthetic_spread_data: Dict) -> Dict:
-    """Create unified DataFrame from SpreadViewer-only data"""
-    print("🔄 Creating unified DataFrame from SpreadViewer data...")
+def create_unified_spreadviewer_data(synthetic_spread_data: Dict,
+                                     formatted: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None) -> Dict:
+    """Create unified DataFrame from SpreadViewer-only data (formatted: optional format_spread_data result)"""
+    logger.debug("Creating unified DataFrame from SpreadViewer data")
     
     # Extract raw data
-    synthetic_orders = synthetic_spread_data.get('spread_orders', pd.DataFrame())
-    synthetic_trades = synthetic_spread_data.get('spread_trades', pd.DataFrame())
+    synthetic_orders = synthetic_spread_data.get('spread_orders', _EMPTY_FRAME)
+    synthetic_trades = synthetic_spread_data.get('spread_trades', _EMPTY_FRAME)
     
     # Transform to target format
-    print("   🔄 Transforming SpreadViewer data to target format")
-    synthetic_orders_formatted = transform_orders_to_target_format(synthetic_orders, 'spreadviewer')
-    synthetic_trades_formatted = transform_trades_to_target_format(synthetic_trades, 'spreadviewer')
+    logger.debug("Transforming SpreadViewer data to target format")
+    synthetic_orders_formatted, synthetic_trades_formatted = (
+        formatted or format_spread_data(synthetic_spread_data, 'spreadviewer'))
     
-    print(f"      ✅ Formatted: {len(synthetic_orders_formatted)} orders, {len(synthetic_trades_formatted)} trades")
+    logger.debug("Formatted: %d orders, %d trades", len(synthetic_orders_formatted), len(synthetic_trades_formatted))
     
     # Union merge orders + trades
-    print("   🎉 Final union merge (trades + orders → unified DataFrame)")
-    unified_data = pd.DataFrame()
-    
-    if not synthetic_trades_formatted.empty:
-        unified_data = pd.concat([unified_data, synthetic_trades_formatted], axis=0)
-    if not synthetic_orders_formatted.empty:
-        unified_data = pd.concat([unified_data, synthetic_orders_formatted], axis=0)
+    logger.debug("Final union merge (trades + orders -> unified DataFrame)")
+    unified_data = _assemble_unified([synthetic_trades_formatted, synthetic_orders_formatted])
     
-    if not unified_data.empty:
-        # Sort by timestamp and ensure target column order
-        unified_data = unified_data.sort_index()
-        target_columns = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-        unified_data = unified_data.reindex(columns=target_columns)
-    
-    print(f"      ✅ Unified dataset: {len(unified_data)} total records (trades + orders)")
+    logger.debug("Unified dataset: %d total records (trades + orders)", len(unified_data))
     
     # Create result with unified structure
     result = {
@@ -227,42 +284,31 @@ def create_unified_spreadviewer_data(synthetic_spread_data: Dict) -> Dict:
         }
     }
     
-    print(f"   ✅ Unified SpreadViewer dataset created: {len(unified_data)} total records")
+    logger.debug("Unified SpreadViewer dataset created: %d total records", len(unified_data))
     
     return result
 
 
-def create_unified_real_spread_data(real_spread_data: Dict) -> Dict:
-    """Create unified DataFrame from DataFetcher-only data"""
-    print("🔄 Creating unified DataFrame from real spread data...")
+def create_unified_real_spread_data(real_spread_data: Dict,
+                                    formatted: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None) -> Dict:
+    """Create unified DataFrame from DataFetcher-only data (formatted: optional format_spread_data result)"""
+    logger.debug("Creating unified DataFrame from real spread data")
     
     # Extract raw data
-    real_orders = real_spread_data.get('spread_orders', pd.DataFrame())
-    real_trades = real_spread_data.get('spread_trades', pd.DataFrame())
+    real_orders = real_spread_data.get('spread_orders', _EMPTY_FRAME)
+    real_trades = real_spread_data.get('spread_trades', _EMPTY_FRAME)
     
     # Transform to target format
-    print("   🔄 Transforming real spread data to target format")
-    real_orders_formatted = transform_orders_to_target_format(real_orders, 'datafetcher')
-    real_trades_formatted = transform_trades_to_target_format(real_trades, 'datafetcher')
+    logger.debug("Transforming real spread data to target format")
+    real_orders_formatted, real_trades_formatted = formatted or format_spread_data(real_spread_data, 'datafetcher')
     
-    print(f"      ✅ Formatted: {len(real_orders_formatted)} orders, {len(real_trades_formatted)} trades")
+    logger.debug("Formatted: %d orders, %d trades", len(real_orders_formatted), len(real_trades_formatted))
     
     # Union merge orders + trades
-    print("   🎉 Final union merge (trades + orders → unified DataFrame)")
-    unified_data = pd.DataFrame()
-    
-    if not real_trades_formatted.empty:
-        unified_data = pd.concat([unified_data, real_trades_formatted], axis=0)
-    if not real_orders_formatted.empty:
-        unified_data = pd.concat([unified_data, real_orders_formatted], axis=0)
-    
-    if not unified_data.empty:
-        # Sort by timestamp and ensure target column order
-        unified_data = unified_data.sort_index()
-        target_columns = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
-        unified_data = unified_data.reindex(columns=target_columns)
+    logger.debug("Final union merge (trades + orders -> unified DataFrame)")
+    unified_data = _assemble_unified([real_trades_formatted, real_orders_formatted])
     
-    print(f"      ✅ Unified dataset: {len(unified_data)} total records (trades + orders)")
+    logger.debug("Unified dataset: %d total records (trades + orders)", len(unified_data))
     
     # Create result with unified structure
     result = {
@@ -275,6 +321,6 @@ def create_unified_real_spread_data(real_spread_data: Dict) -> Dict:
         }
     }
     
-    print(f"   ✅ Unified real spread dataset created: {len(unified_data)} total records")
+    logger.debug("Unified real spread dataset created: %d total records", len(unified_data))
     
     return result
\ No newline at end of file
@@ -8,7 +8,11 @@ Main orchestration class that coordinates all data fetching operations.
 import sys
 import os
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional
 import pandas as pd
 
@@ -17,21 +21,40 @@ sys.path.insert(0, '/mnt/c/Users/krajcovic/Documents/GitHub/ATS_DataFetch')
 from src.core.data_fetcher import DataFetcher, TPDATA_AVAILABLE
 
 from .contracts import ContractSpec, parse_absolute_contract, create_contract_config_from_spec
-from .spreadviewer_integration import fetch_synthetic_spread_multiple_periods
+from .data_transformers import downcast_for_storage
+from .spreadviewer_integration import close_tpdata, fetch_synthetic_spread_multiple_periods
 from .merger import (
+    format_spread_data,
     merge_spread_data,
     create_unified_spreadviewer_data,
     create_unified_real_spread_data
 )
 from .validators import BidAskValidator
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# DataFetcher attributes holding the TPData connections it opens
+_FETCHER_CONNECTIONS = ('data_class_oracle', 'data_class_pg', 'data_class_da')
+
+
+def _safe_len(data: Dict, key: str) -> int:
+    """Length of data[key] for progress logging, 0 when the key is missing or None"""
+    value = data.get(key)
+    return 0 if value is None else len(value)
+
 
 class DataFetchOrchestrator:
     """
     Main orchestrator for unified data fetching integrating DataFetcher and SpreadViewer.
     
     Provides a clean API for fetching single contracts, spreads, and hybrid combinations
-    of real and synthetic data.
+    of real and synthetic data. Use as a context manager (or call close()) so the
+    pooled DataFetcher connections are released.
     """
     
     def __init__(self, output_base: str = None):
@@ -53,6 +76,42 @@ class DataFetchOrchestrator:
         # Check dependencies
         if not TPDATA_AVAILABLE:
             raise RuntimeError("TPData not available - cannot initialize orchestrator")
+        
+        # Output directory is created once here rather than on every save
+        self._output_path = Path(self.output_base)
+        self._output_path.mkdir(parents=True, exist_ok=True)
+        
+        # Idle DataFetchers (each holds its own TPData connections), reused across
+        # fetches but never used by two threads at once
+        self._fetcher_pool: List[DataFetcher] = []
+        self._fetcher_lock = threading.Lock()
+    
+    @contextmanager
+    def _borrow_fetcher(self):
+        """Lend an idle cached DataFetcher, creating one only when none is free"""
+        with self._fetcher_lock:
+            fetcher = self._fetcher_pool.pop() if self._fetcher_pool else None
+        if fetcher is None:
+            fetcher = DataFetcher(allowed_broker_ids=[1441])
+        try:
+            yield fetcher
+        finally:
+            with self._fetcher_lock:
+                self._fetcher_pool.append(fetcher)
+    
+    def close(self) -> None:
+        """Disconnect the TPData connections of every pooled DataFetcher (call once fetches are done)"""
+        with self._fetcher_lock:
+            fetchers, self._fetcher_pool = self._fetcher_pool, []
+        for fetcher in fetchers:
+            for attr in _FETCHER_CONNECTIONS:
+                close_tpdata(getattr(fetcher, attr, None))
+    
+    def __enter__(self) -> 'DataFetchOrchestrator':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def integrated_fetch(self, config: Dict) -> Dict:
         """
@@ -83,8 +142,8 @@ class DataFetchOrchestrator:
         # Parse absolute contracts
         parsed_contracts = [parse_absolute_contract(c) for c in contracts]
         
-        start_date = datetime.strptime(period['start_date'], '%Y-%m-%d')
-        end_date = datetime.strptime(period['end_date'], '%Y-%m-%d')
+        start_date = datetime.fromisoformat(period['start_date'])
+        end_date = datetime.fromisoformat(period['end_date'])
         
         results = {
             'metadata': {
@@ -107,9 +166,6 @@ class DataFetchOrchestrator:
             print(f"🔍 SINGLE LEG MODE: {contracts[0]}")
             contract = parsed_contracts[0]
             
-            # Use DataFetcher for individual contract
-            fetcher = DataFetcher(allowed_broker_ids=[1441])
-            
             # Create contract config for DataFetcher
             contract_config = {
                 'market': contract.market,
@@ -120,136 +176,209 @@ class DataFetchOrchestrator:
                 'prod': contract.product
             }
             
-            single_data = fetcher.fetch_contract_data(
-                contract_config,
-                include_trades=True,
-                include_orders=True
-            )
-            
-            results['single_leg_data'] = single_data
+            # Use DataFetcher for individual contract
+            results['single_leg_data'] = self._fetch_leg(contract_config)
             
         elif len(parsed_contracts) == 2:
             # SPREAD MODE
             print(f"🔍 SPREAD MODE: {contracts[0]} vs {contracts[1]}")
             contract1, contract2 = parsed_contracts
             
-            # Real spread via DataFetcher (if requested)
-            if options.get('include_real_spread', True):
-                print("📈 Fetching real spread contract...")
-                try:
-                    fetcher = DataFetcher(allowed_broker_ids=[1441])
-                    
-                    # Create contract configs for both legs
-                    contract1_config = create_contract_config_from_spec(contract1, period)
-                    contract2_config = create_contract_config_from_spec(contract2, period)
-                    
-                    # For cross-market spreads, DataFetcher needs combined market string
-                    if contract1.market != contract2.market:
-                        combined_market = f"{contract1.market}_{contract2.market}"
-                        print(f"   Cross-market spread detected: {contract1.market} + {contract2.market} → market='{combined_market}'")
-                        contract1_config['market'] = combined_market
-                        contract2_config['market'] = combined_market
-                    
-                    real_spread_data = fetcher.fetch_spread_contract_data(
-                        contract1_config, contract2_config,
-                        include_trades=True, include_orders=True
-                    )
-                    results['real_spread_data'] = real_spread_data
-                    print(f"   ✅ Real spread: {len(real_spread_data.get('spread_orders', pd.DataFrame()))} orders, {len(real_spread_data.get('spread_trades', pd.DataFrame()))} trades")
-                    
-                    # Process real spread data into unified format
-                    unified_real_data = create_unified_real_spread_data(real_spread_data)
-                    results['real_spread_data']['unified_spread_data'] = unified_real_data['unified_spread_data']
-                    
-                    # Save unified real spread data
-                    print("💾 Saving unified real spread data...")
-                    self.save_unified_results(results, config['contracts'], config['period'], 'real_only', config.get('test_mode', False))
-                except Exception as e:
-                    print(f"   ❌ Real spread failed: {e}")
-                    results['real_spread_error'] = str(e)
+            include_real = options.get('include_real_spread', True)
+            include_synthetic = options.get('include_synthetic_spread', True)
+            test_mode = config.get('test_mode', False)
+            real_formatted = synthetic_formatted = None
             
-            # Synthetic spread via SpreadViewer (if requested) 
-            if options.get('include_synthetic_spread', True):
-                print("🔧 Fetching synthetic spread...")
-                try:
-                    synthetic_spread_data = fetch_synthetic_spread_multiple_periods(
+            # Real (DataFetcher) and synthetic (SpreadViewer) fetches are independent
+            # DB round trips - run them concurrently, then unify and save in order
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                real_future = None
+                synthetic_future = None
+                if include_real:
+                    print("📈 Fetching real spread contract...")
+                    real_future = executor.submit(self._fetch_real_spread, contract1, contract2, period)
+                if include_synthetic:
+                    print("🔧 Fetching synthetic spread...")
+                    synthetic_future = executor.submit(
+                        fetch_synthetic_spread_multiple_periods,
                         contract1, contract2, start_date, end_date, coefficients, n_s
                     )
-                    # Store raw synthetic data first
-                    results['synthetic_spread_data'] = synthetic_spread_data
-                    
-                    # Create unified DataFrame from synthetic data
-                    unified_synthetic = create_unified_spreadviewer_data(synthetic_spread_data)
-                    results['synthetic_spread_data']['unified_spread_data'] = unified_synthetic['unified_spread_data']
-                    print(f"   ✅ Synthetic spread: {len(synthetic_spread_data.get('spread_orders', pd.DataFrame()))} orders, {len(synthetic_spread_data.get('spread_trades', pd.DataFrame()))} trades")
-                    print(f"   🎉 Unified synthetic data: {len(unified_synthetic.get('unified_spread_data', pd.DataFrame()))} total records")
-                    
-                    # Save unified synthetic spread data
-                    print("💾 Saving unified synthetic spread data...")
-                    self.save_unified_results(results, config['contracts'], config['period'], 'synthetic_only', config.get('test_mode', False))
-                except Exception as e:
-                    print(f"   ❌ Synthetic spread failed: {e}")
-                    results['synthetic_spread_error'] = str(e)
+                
+                # Real spread via DataFetcher (if requested)
+                if real_future is not None:
+                    try:
+                        real_spread_data = real_future.result()
+                        results['real_spread_data'] = real_spread_data
+                        print(f"   ✅ Real spread: {_safe_len(real_spread_data, 'spread_orders')} orders, {_safe_len(real_spread_data, 'spread_trades')} trades")
+                        
+                        # Process real spread data into unified format
+                        # Formatted once, reused by the merge below
+                        real_formatted = format_spread_data(real_spread_data, 'datafetcher')
+                        unified_real_data = create_unified_real_spread_data(real_spread_data, formatted=real_formatted)
+                        results['real_spread_data']['unified_spread_data'] = unified_real_data['unified_spread_data']
+                        
+                        # Save unified real spread data (superseded by the synthetic/merged
+                        # output when the synthetic spread is also requested)
+                        if include_synthetic:
+                            self._save_intermediate(results, config, 'real_only', test_mode)
+                        else:
+                            print("💾 Saving unified real spread data...")
+                            self.save_unified_results(results, config['contracts'], config['period'], 'real_only', test_mode)
+                    except Exception as e:
+                        print(f"   ❌ Real spread failed: {e}")
+                        results['real_spread_error'] = str(e)
+                
+                # Synthetic spread via SpreadViewer (if requested) 
+                if synthetic_future is not None:
+                    try:
+                        synthetic_spread_data = synthetic_future.result()
+                        # Store raw synthetic data first
+                        results['synthetic_spread_data'] = synthetic_spread_data
+                        
+                        # Create unified DataFrame from synthetic data
+                        synthetic_formatted = format_spread_data(synthetic_spread_data, 'spreadviewer')
+                        unified_synthetic = create_unified_spreadviewer_data(synthetic_spread_data,
+                                                                             formatted=synthetic_formatted)
+                        results['synthetic_spread_data']['unified_spread_data'] = unified_synthetic['unified_spread_data']
+                        print(f"   ✅ Synthetic spread: {_safe_len(synthetic_spread_data, 'spread_orders')} orders, {_safe_len(synthetic_spread_data, 'spread_trades')} trades")
+                        print(f"   🎉 Unified synthetic data: {_safe_len(unified_synthetic, 'unified_spread_data')} total records")
+                        failed_periods = synthetic_spread_data.get('failed_periods', [])
+                        if failed_periods:
+                            print(f"   ⚠️  Synthetic spread is missing {len(failed_periods)} failed period(s): "
+                                  + ", ".join(f"{p['start_date']} to {p['end_date']}" for p in failed_periods))
+                        
+                        # Save unified synthetic spread data (superseded by the merged
+                        # output when real spread data is available)
+                        if 'real_spread_data' in results:
+                            self._save_intermediate(results, config, 'synthetic_only', test_mode)
+                        else:
+                            print("💾 Saving unified synthetic spread data...")
+                            self.save_unified_results(results, config['contracts'], config['period'], 'synthetic_only', test_mode)
+                    except Exception as e:
+                        print(f"   ❌ Synthetic spread failed: {e}")
+                        results['synthetic_spread_error'] = str(e)
+                        
+                        # Nothing to merge with - the real spread is the final output
+                        if 'real_spread_data' in results:
+                            print("💾 Saving unified real spread data...")
+                            self.save_unified_results(results, config['contracts'], config['period'], 'real_only', test_mode)
             
             # Merge real and synthetic spread data (if both are requested)
-            if (options.get('include_real_spread', True) and 
-                options.get('include_synthetic_spread', True) and
+            if (include_real and include_synthetic and
                 'real_spread_data' in results and 
                 'synthetic_spread_data' in results):
                 print("🔗 Merging real and synthetic spread data...")
                 try:
                     merged_spread_data = merge_spread_data(
                         results['real_spread_data'],
-                        results['synthetic_spread_data']
+                        results['synthetic_spread_data'],
+                        real_formatted=real_formatted,
+                        synthetic_formatted=synthetic_formatted
                     )
                     results['merged_spread_data'] = merged_spread_data
-                    print(f"   ✅ Merged spread: {len(merged_spread_data.get('unified_spread_data', pd.DataFrame()))} total records")
+                    print(f"   ✅ Merged spread: {_safe_len(merged_spread_data, 'unified_spread_data')} total records")
                     
                     # Save unified merged spread data
                     print("💾 Saving unified merged spread data...")
-                    self.save_unified_results(results, config['contracts'], config['period'], 'merged', config.get('test_mode', False))
+                    self.save_unified_results(results, config['contracts'], config['period'], 'merged', test_mode)
                 except Exception as e:
                     print(f"   ❌ Spread merging failed: {e}")
                     results['spread_merge_error'] = str(e)
+                    
+                    # Merge itself failed - the synthetic spread is the final output
+                    if 'merged_spread_data' not in results:
+                        print("💾 Saving unified synthetic spread data...")
+                        self.save_unified_results(results, config['contracts'], config['period'], 'synthetic_only', test_mode)
             
             # Individual legs (if requested)
             if options.get('include_individual_legs', False):
                 print("📊 Fetching individual leg data...")
-                fetcher = DataFetcher(allowed_broker_ids=[1441])
                 
-                for i, contract in enumerate(parsed_contracts):
-                    contract_config = {
+                leg_configs = [
+                    {
                         'market': contract.market,
                         'tenor': contract.tenor, 
                         'contract': contract.contract,
                         'start_date': period['start_date'],
                         'end_date': period['end_date'],
                         'prod': contract.product
-                    }
+                    } for contract in parsed_contracts
+                ]
+                
+                # Both legs are independent DB round trips - fetch them concurrently
+                # (each worker borrows its own pooled DataFetcher)
+                with ThreadPoolExecutor(max_workers=len(leg_configs)) as executor:
+                    leg_futures = [executor.submit(self._fetch_leg, contract_config)
+                                   for contract_config in leg_configs]
                     
-                    try:
-                        leg_data = fetcher.fetch_contract_data(
-                            contract_config, include_trades=True, include_orders=True
-                        )
-                        results[f'leg_{i+1}_data'] = leg_data
-                        print(f"   ✅ Leg {i+1}: {len(leg_data.get('orders', pd.DataFrame()))} orders, {len(leg_data.get('trades', pd.DataFrame()))} trades")
-                    except Exception as e:
-                        print(f"   ❌ Leg {i+1} failed: {e}")
-                        results[f'leg_{i+1}_error'] = str(e)
+                    for i, future in enumerate(leg_futures):
+                        try:
+                            leg_data = future.result()
+                            results[f'leg_{i+1}_data'] = leg_data
+                            print(f"   ✅ Leg {i+1}: {_safe_len(leg_data, 'orders')} orders, {_safe_len(leg_data, 'trades')} trades")
+                        except Exception as e:
+                            print(f"   ❌ Leg {i+1} failed: {e}")
+                            results[f'leg_{i+1}_error'] = str(e)
         else:
             raise ValueError("Only 1 or 2 contracts supported")
         
         return results
     
-    def save_unified_results(self, results: Dict, contracts: List[str], period: Dict, stage: str = 'unified', test_mode: bool = False) -> None:
+    def _fetch_real_spread(self, contract1: ContractSpec, contract2: ContractSpec, period: Dict) -> Dict:
+        """Fetch the real (exchange-listed) spread contract via DataFetcher"""
+        # Create contract configs for both legs
+        contract1_config = create_contract_config_from_spec(contract1, period)
+        contract2_config = create_contract_config_from_spec(contract2, period)
+        
+        # For cross-market spreads, DataFetcher needs combined market string
+        if contract1.market != contract2.market:
+            combined_market = f"{contract1.market}_{contract2.market}"
+            print(f"   Cross-market spread detected: {contract1.market} + {contract2.market} → market='{combined_market}'")
+            contract1_config['market'] = combined_market
+            contract2_config['market'] = combined_market
+        
+        with self._borrow_fetcher() as fetcher:
+            return fetcher.fetch_spread_contract_data(
+                contract1_config, contract2_config,
+                include_trades=True, include_orders=True
+            )
+    
+    def _fetch_leg(self, contract_config: Dict) -> Dict:
+        """Fetch trades and orders for one contract via DataFetcher"""
+        with self._borrow_fetcher() as fetcher:
+            return fetcher.fetch_contract_data(
+                contract_config, include_trades=True, include_orders=True
+            )
+    
+    def _save_intermediate(self, results: Dict, config: Dict, stage: str, test_mode: bool) -> None:
+        """
+        Save a stage whose file would be overwritten by a later stage.
+        
+        Only written in test mode, into stages/<stage>/ so stages do not clobber
+        each other or the final output.
+        """
+        if not test_mode:
+            print(f"   ⏭️  Skipping intermediate {stage} save (superseded by final output)")
+            return
+        
+        print(f"💾 Saving intermediate {stage} spread data...")
+        self.save_unified_results(results, config['contracts'], config['period'], stage, test_mode,
+                                  output_dir=self._output_path / 'stages' / stage)
+    
+    def save_unified_results(self, results: Dict, contracts: List[str], period: Dict, stage: str = 'unified',
+                             test_mode: bool = False, output_dir: Optional[Path] = None) -> None:
         """Save unified spread data with format options based on test mode
         
         Args:
             test_mode: If True, saves all formats (parquet, csv, json) to RawData/test/
                       If False, saves only parquet to RawData/
+            output_dir: Directory to save into instead of the output base (created if missing)
         """
-        output_dir = self.output_base
-        os.makedirs(output_dir, exist_ok=True)
+        if output_dir is None:
+            output_dir = self._output_path
+        else:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
@@ -294,52 +423,68 @@ class DataFetchOrchestrator:
             print(f"      📊 Final validation: {stats['filtered_count']}/{stats['total_processed']} "
                   f"negative spreads filtered ({stats['filter_rate']:.1f}%)")
         
-        # Always save as parquet
-        parquet_path = os.path.join(output_dir, f'{filename}.parquet')
-        validated_data.to_parquet(parquet_path)
+        # Volume/action/broker_id/count fit losslessly in 32-bit dtypes
+        validated_data = downcast_for_storage(validated_data)
+        
+        # Always save as parquet (zstd: smaller files than the snappy default at
+        # similar write speed; supported by both pyarrow and fastparquet)
+        parquet_path = output_dir / f'{filename}.parquet'
+        validated_data.to_parquet(parquet_path, compression='zstd')
         print(f"   📁 Saved validated spread data: {parquet_path}")
         
         # In test mode, also save CSV and pickle formats
         if test_mode:
             # Save as CSV
-            csv_path = os.path.join(output_dir, f'{filename}.csv')
+            csv_path = output_dir / f'{filename}.csv'
             validated_data.to_csv(csv_path)
             print(f"   📁 Saved validated spread data: {csv_path}")
             
             # Save as pickle
-            pkl_path = os.path.join(output_dir, f'{filename}.pkl')
+            pkl_path = output_dir / f'{filename}.pkl'
             validated_data.to_pickle(pkl_path)
             print(f"   📁 Saved validated spread data: {pkl_path}")
         
-        # Save metadata
-        metadata = {
-            'stage': stage,
-            'timestamp': timestamp,
-            'contracts': contracts,
-            'period': period,
-            'n_s': results.get('metadata', {}).get('n_s', 3),
-            'data_source': data_source,
-            'unified_data_info': {
-                'total_records': len(unified_data),
-                'columns': list(unified_data.columns),
-                'date_range': {
-                    'start': str(unified_data.index.min()) if not unified_data.empty else None,
-                    'end': str(unified_data.index.max()) if not unified_data.empty else None
-                }
-            }
-        }
-        
-        # Add source statistics if available
-        for key in ['merged_spread_data', 'synthetic_spread_data', 'real_spread_data']:
-            if key in results and 'source_stats' in results[key]:
-                metadata[f'{key}_stats'] = results[key]['source_stats']
+        # Shape/columns are reused by the metadata and the summary below
+        n_records = len(unified_data)
+        columns = list(unified_data.columns)
         
-        # In test mode, also save metadata
+        # In test mode, also save metadata (only built when it is written)
         if test_mode:
-            metadata_path = os.path.join(output_dir, f'{filename}_metadata.json')
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2, default=str)
+            index = unified_data.index
+            metadata = {
+                'stage': stage,
+                'timestamp': timestamp,
+                'contracts': contracts,
+                'period': period,
+                'n_s': results.get('metadata', {}).get('n_s', 3),
+                'data_source': data_source,
+                'unified_data_info': {
+                    'total_records': n_records,
+                    'columns': columns,
+                    'date_range': {
+                        'start': str(index.min()) if n_records else None,
+                        'end': str(index.max()) if n_records else None
+                    }
+                }
+            }
+            
+            # Add source statistics if available
+            for key in ['merged_spread_data', 'synthetic_spread_data', 'real_spread_data']:
+                if key in results and 'source_stats' in results[key]:
+                    metadata[f'{key}_stats'] = results[key]['source_stats']
+            
+            metadata_path = output_dir / f'{filename}_metadata.json'
+            if ORJSON_AVAILABLE:
+                # orjson serializes the nested stats dicts (numpy scalars, datetimes)
+                # natively; str() is only the fallback for anything else
+                metadata_path.write_bytes(orjson.dumps(
+                    metadata, default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                ))
+            else:
+                with open(metadata_path, 'w') as f:
+                    json.dump(metadata, f, indent=2, default=str)
             print(f"   📁 Saved metadata: {metadata_path}")
         
-        print(f"   ✅ Unified data summary: {len(unified_data):,} records, {unified_data.shape[1]} columns")
-        print(f"   📊 Sample structure: {list(unified_data.columns)}")
\ No newline at end of file
+        print(f"   ✅ Unified data summary: {n_records:,} records, {len(columns)} columns")
+        print(f"   📊 Sample structure: {columns}")
\ No newline at end of file
@@ -5,14 +5,20 @@ SpreadViewer Integration
 Functions for integrating with the SpreadViewer synthetic spread calculation system.
 """
 
+import logging
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, time
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from .contracts import ContractSpec, RelativePeriod
 from .date_utils import convert_absolute_to_relative_periods, calculate_synchronized_product_dates
+from .data_transformers import drop_duplicate_records
 
 # Add paths for SpreadViewer imports
 sys.path.insert(0, '/mnt/c/Users/krajcovic/Documents/GitHub/ATS_DataFetch/source_repos/EnergyTrading/Python')
@@ -25,6 +31,86 @@ except ImportError as e:
     print(f"Warning: SpreadViewer imports failed: {e}")
     SPREADVIEWER_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# Price buffer around the spread bid/ask used when filtering synthetic trades
+_TRADE_BUFFER = 0.001
+
+# Upper bound on concurrent per-period SpreadViewer fetches (each is DB I/O bound)
+_MAX_PERIOD_WORKERS = 8
+
+# SpreadViewer trading session and aggregation columns (constant across calls)
+_SESSION_START = time(9, 0, 0)
+_SESSION_END = time(17, 25, 0)
+_ORDER_COLUMNS = ['bid', 'ask']
+_TRADE_COLUMNS = ['bid', 'ask', 'volume', 'broker_id']
+
+
+def close_tpdata(db_class: Optional['TPData']) -> None:
+    """
+    Disconnect a TPData handle; None and handles without a disconnect method are skipped.
+    
+    TPData disconnects via disconnect_from_database(); close() is the fallback
+    for other handle types. Errors are logged, not raised.
+    """
+    for method_name in ('disconnect_from_database', 'close'):
+        disconnect = getattr(db_class, method_name, None)
+        if callable(disconnect):
+            try:
+                disconnect()
+            except Exception:
+                logger.warning("Disconnecting TPData handle failed", exc_info=True)
+            return
+
+
+class _TPDataPool:
+    """
+    TPData handles shared by the period fetches of one synthetic spread fetch.
+    
+    A handle is used by one period fetch at a time, so at most one handle per
+    concurrent fetch is opened. Use as a context manager: every handle opened
+    through the pool is closed on exit.
+    """
+    
+    def __init__(self):
+        self._idle: List['TPData'] = []
+        self._opened: List['TPData'] = []
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> 'TPData':
+        """Take an idle handle, opening a new one if none is free"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        db_class = TPData()
+        with self._lock:
+            self._opened.append(db_class)
+        return db_class
+    
+    def release(self, db_class: 'TPData') -> None:
+        """Return a handle for the next period fetch"""
+        with self._lock:
+            self._idle.append(db_class)
+    
+    def close(self) -> None:
+        """Close every handle opened through the pool"""
+        with self._lock:
+            opened, self._opened, self._idle = self._opened, [], []
+        for db_class in opened:
+            close_tpdata(db_class)
+    
+    def __enter__(self) -> '_TPDataPool':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@lru_cache(maxsize=1024)
+def _business_days(start_date: str, end_date: str) -> pd.DatetimeIndex:
+    """Business days between two ISO date strings (a pure function of the endpoints)"""
+    return pd.date_range(datetime.fromisoformat(start_date), datetime.fromisoformat(end_date), freq='B')
+
 
 def create_spreadviewer_config_for_period(contract1: ContractSpec, contract2: ContractSpec,
                                         rel_period1: RelativePeriod, rel_period2: RelativePeriod,
@@ -45,6 +131,39 @@ def create_spreadviewer_config_for_period(contract1: ContractSpec, contract2: Co
     }
 
 
+def overlapping_periods(periods1: List[Tuple[RelativePeriod, datetime, datetime]],
+                        periods2: List[Tuple[RelativePeriod, datetime, datetime]]
+                        ) -> List[Tuple[RelativePeriod, RelativePeriod, datetime, datetime]]:
+    """
+    Pair up the overlapping (relative_period, start, end) ranges of two contracts.
+    
+    Each contract's ranges partition its date range without overlap, so a
+    two-pointer sweep over both lists (sorted by start) finds every overlap in
+    O(N + M) instead of testing all N x M pairs. Pairs are returned in start order.
+    """
+    periods1 = sorted(periods1, key=lambda p: p[1])
+    periods2 = sorted(periods2, key=lambda p: p[1])
+    
+    overlaps = []
+    i = j = 0
+    while i < len(periods1) and j < len(periods2):
+        rel_period1, p_start1, p_end1 = periods1[i]
+        rel_period2, p_start2, p_end2 = periods2[j]
+        
+        overlap_start = max(p_start1, p_start2)
+        overlap_end = min(p_end1, p_end2)
+        if overlap_start <= overlap_end:
+            overlaps.append((rel_period1, rel_period2, overlap_start, overlap_end))
+        
+        # Advance whichever range finishes first; it cannot overlap anything later
+        if p_end1 < p_end2:
+            i += 1
+        else:
+            j += 1
+    
+    return overlaps
+
+
 def fetch_synthetic_spread_multiple_periods(contract1: ContractSpec, contract2: ContractSpec,
                                           start_date: datetime, end_date: datetime,
                                           coefficients: List[float], n_s: int = 3) -> Dict:
@@ -60,52 +179,70 @@ def fetch_synthetic_spread_multiple_periods(contract1: ContractSpec, contract2:
     periods1 = convert_absolute_to_relative_periods(contract1, start_date, end_date, n_s)
     periods2 = convert_absolute_to_relative_periods(contract2, start_date, end_date, n_s)
     
-    # Find overlapping periods
-    all_results = {}
-    all_orders = pd.DataFrame()
-    all_trades = pd.DataFrame()
+    # Find overlapping periods - one SpreadViewer fetch per overlapping pair
+    spread_configs = []
+    for rel_period1, rel_period2, overlap_start, overlap_end in overlapping_periods(periods1, periods2):
+        print(f"   📅 Period: {overlap_start.strftime('%Y-%m-%d')} to {overlap_end.strftime('%Y-%m-%d')} (M{rel_period1.relative_offset}/M{rel_period2.relative_offset})")
+        
+        # Create SpreadViewer configuration for this period
+        spread_configs.append(create_spreadviewer_config_for_period(
+            contract1, contract2, rel_period1, rel_period2, 
+            overlap_start, overlap_end, coefficients, n_s
+        ))
     
-    for (rel_period1, p_start1, p_end1) in periods1:
-        for (rel_period2, p_start2, p_end2) in periods2:
-            # Find overlap
-            overlap_start = max(p_start1, p_start2)
-            overlap_end = min(p_end1, p_end2)
-            
-            if overlap_start <= overlap_end:
-                print(f"   📅 Period: {overlap_start.strftime('%Y-%m-%d')} to {overlap_end.strftime('%Y-%m-%d')} (M{rel_period1.relative_offset}/M{rel_period2.relative_offset})")
-                
-                # Create SpreadViewer configuration for this period
-                spread_config = create_spreadviewer_config_for_period(
-                    contract1, contract2, rel_period1, rel_period2, 
-                    overlap_start, overlap_end, coefficients, n_s
-                )
-                
-                # Fetch data for this period
-                period_results = fetch_spreadviewer_for_period(spread_config)
-                
-                # Accumulate results
-                if 'spread_orders' in period_results and not period_results['spread_orders'].empty:
-                    all_orders = pd.concat([all_orders, period_results['spread_orders']], axis=0)
-                
-                if 'spread_trades' in period_results and not period_results['spread_trades'].empty:
-                    all_trades = pd.concat([all_trades, period_results['spread_trades']], axis=0)
+    # Fetch all periods concurrently, results in period order. A failed period
+    # does not abort the batch: it settles as empty frames plus an 'error' and
+    # is listed in failed_periods, so callers can tell the data is partial
+    period_results_list = []
+    if spread_configs:
+        with _TPDataPool() as tpdata_pool, \
+                ThreadPoolExecutor(max_workers=min(_MAX_PERIOD_WORKERS, len(spread_configs))) as executor:
+            period_results_list = list(executor.map(
+                partial(fetch_spreadviewer_for_period, tpdata_pool=tpdata_pool), spread_configs))
+    
+    failed_periods = [
+        {'start_date': config['start_date'], 'end_date': config['end_date'], 'error': result['error']}
+        for config, result in zip(spread_configs, period_results_list) if 'error' in result
+    ]
+    if failed_periods:
+        print(f"   ⚠️  {len(failed_periods)} of {len(spread_configs)} SpreadViewer periods failed - synthetic data is partial")
     
-    # Sort by timestamp and remove duplicates
+    # Accumulate results with a single concat per frame type
+    orders_frames = [r['spread_orders'] for r in period_results_list
+                     if 'spread_orders' in r and not r['spread_orders'].empty]
+    trades_frames = [r['spread_trades'] for r in period_results_list
+                     if 'spread_trades' in r and not r['spread_trades'].empty]
+    all_orders = pd.concat(orders_frames, axis=0, copy=False) if orders_frames else pd.DataFrame()
+    all_trades = pd.concat(trades_frames, axis=0, copy=False) if trades_frames else pd.DataFrame()
+    
+    # Sort by timestamp (periods arrive in order, so a stable merge sort is near
+    # linear) and remove duplicates: order snapshots are unique per timestamp,
+    # so the latest wins; trades only drop exact duplicate records
     if not all_orders.empty:
-        all_orders = all_orders.sort_index().drop_duplicates()
+        all_orders = all_orders[~all_orders.index.duplicated(keep='last')].sort_index(kind='mergesort')
     if not all_trades.empty:
-        all_trades = all_trades.sort_index().drop_duplicates()
+        all_trades = drop_duplicate_records(all_trades.sort_index(kind='mergesort'))
     
     return {
         'spread_orders': all_orders,
         'spread_trades': all_trades,
         'method': 'synthetic_spreadviewer',
-        'periods_processed': len(periods1) * len(periods2)
+        'periods_processed': len(periods1) * len(periods2),
+        'failed_periods': failed_periods
     }
 
 
-def fetch_spreadviewer_for_period(config: Dict) -> Dict:
-    """Fetch SpreadViewer data for a specific period"""
+def fetch_spreadviewer_for_period(config: Dict, tpdata_pool: Optional[_TPDataPool] = None) -> Dict:
+    """
+    Fetch SpreadViewer data for a specific period
+    
+    The TPData handle comes from tpdata_pool when given (shared across the
+    periods of one multi-period fetch); otherwise a handle is opened for this
+    call and closed before returning.
+    
+    Fetch errors (including opening the TPData handle) are not raised: the
+    result then holds empty frames and the error message under 'error'.
+    """
     if not SPREADVIEWER_AVAILABLE:
         raise ImportError("SpreadViewer not available")
     
@@ -116,9 +253,7 @@ def fetch_spreadviewer_for_period(config: Dict) -> Dict:
     coefficients = config['coefficients']
     n_s = config.get('n_s', 3)
     
-    start_date = datetime.strptime(config['start_date'], '%Y-%m-%d')
-    end_date = datetime.strptime(config['end_date'], '%Y-%m-%d')
-    dates = pd.date_range(start_date, end_date, freq='B')
+    dates = _business_days(config['start_date'], config['end_date'])
     
     if len(dates) == 0:
         return {'spread_orders': pd.DataFrame(), 'spread_trades': pd.DataFrame()}
@@ -127,14 +262,19 @@ def fetch_spreadviewer_for_period(config: Dict) -> Dict:
     spread_class = SpreadSingle(markets, tenors, tn1_list, tn2_list, ['eex'])
     data_class = SpreadViewerData()
     data_class_tr = SpreadViewerData()
-    db_class = TPData()
+    owns_pool = tpdata_pool is None
+    if owns_pool:
+        tpdata_pool = _TPDataPool()
+    db_class = None
     
     # Load data - use original tenors, not spread_class.tenors_list
     tenors_list = spread_class.tenors_list  # This should be ['q', 'q'] not ['q_1', 'q_1']
-    start_time = time(9, 0, 0)
-    end_time = time(17, 25, 0)
+    start_time = _SESSION_START
+    end_time = _SESSION_END
     
     try:
+        db_class = tpdata_pool.acquire()
+        
         # Load order book data - using synchronized product_dates for n_s consistency
         print(f"   🔍 Loading order data with:")
         print(f"     Markets: {markets}")
@@ -162,50 +302,58 @@ def fetch_spreadviewer_for_period(config: Dict) -> Dict:
         )
         print(f"   ✅ Trade data loading completed")
         
-        # Process daily data
-        sm_all = pd.DataFrame()
-        tm_all = pd.DataFrame()
+        # Process daily data (frames collected per day, concatenated once after the loop)
+        sm_frames: List[pd.DataFrame] = []
+        tm_frames: List[pd.DataFrame] = []
+        
+        # aggregate_data builds its product mapping from a single-day range, so
+        # days are still aggregated one at a time (per-day details only at DEBUG)
+        print(f"   📅 Processing {len(dates)} dates: {dates[0].date()} to {dates[-1].date()}")
+        empty_days = 0
+        log_days = logger.isEnabledFor(logging.DEBUG)
         
-        for d in dates:
-            d_range = pd.date_range(d, d)
-            print(f"   📅 Processing date: {d}")
-            print(f"     Date range: {d_range}")
+        # Single-day ranges are sliced from one daily calendar (same values and
+        # freq as pd.date_range(d, d), without rebuilding an index per day)
+        calendar = pd.date_range(dates[0], dates[-1])
+        day_offsets = (dates - dates[0]).days
+        
+        for d, offset in zip(dates, day_offsets):
+            d_range = calendar[offset:offset + 1]
             
             # Aggregate order book data - using correct parameter format from working test
-            print(f"   🔧 Calling aggregate_data for date {d}")
-            
             data_dict = spread_class.aggregate_data(
                 data_class, d_range, n_s, gran=None,
                 start_time=start_time, end_time=end_time,
-                col_list=['bid', 'ask']  # Explicitly pass the default col_list
+                col_list=_ORDER_COLUMNS  # Explicitly pass the default col_list
             )
-            
-            print(f"   📊 aggregate_data returned: {type(data_dict)}")
-            if data_dict:
-                print(f"     Keys: {list(data_dict.keys())}")
-                for key, value in data_dict.items():
-                    if hasattr(value, 'shape'):
-                        print(f"     {key}: {value.shape}")
-                    else:
-                        print(f"     {key}: {type(value)}")
-            else:
-                print(f"     ⚠️  Empty or None data_dict")
+            if not data_dict:
+                empty_days += 1
+            if log_days:
+                logger.debug("Date %s: aggregate_data returned %s",
+                             d.date(), {key: getattr(value, 'shape', type(value).__name__)
+                                        for key, value in (data_dict or {}).items()})
             
             # Create spread orders
             sm = spread_class.spread_maker(data_dict, coefficients, trade_type=['cmb', 'cmb']).dropna()
-            sm_all = pd.concat([sm_all, sm], axis=0)
-            
-            # Create spread trades
             if not sm.empty:
-                col_list = ['bid', 'ask', 'volume', 'broker_id']
+                sm_frames.append(sm)
+                
+                # Create spread trades
                 trade_dict = spread_class.aggregate_data(
                     data_class_tr, d_range, n_s, gran='1s',
                     start_time=start_time, end_time=end_time,
-                    col_list=col_list, data_dict=data_dict
+                    col_list=_TRADE_COLUMNS, data_dict=data_dict
                 )
                 
                 tm = spread_class.add_trades(data_dict, trade_dict, coefficients, [True, True])
-                tm_all = pd.concat([tm_all, tm], axis=0)
+                if not tm.empty:
+                    tm_frames.append(tm)
+        
+        if empty_days:
+            print(f"     ⚠️  aggregate_data returned no data for {empty_days} of {len(dates)} dates")
+        
+        sm_all = pd.concat(sm_frames, axis=0, copy=False) if sm_frames else pd.DataFrame()
+        tm_all = pd.concat(tm_frames, axis=0, copy=False) if tm_frames else pd.DataFrame()
         
         # Apply trade adjustment before returning - filter trades against spread bid/ask
         if not tm_all.empty and not sm_all.empty:
@@ -222,7 +370,13 @@ def fetch_spreadviewer_for_period(config: Dict) -> Dict:
         
     except Exception as e:
         print(f"   ⚠️  SpreadViewer fetch failed: {e}")
-        return {'spread_orders': pd.DataFrame(), 'spread_trades': pd.DataFrame()}
+        return {'spread_orders': pd.DataFrame(), 'spread_trades': pd.DataFrame(), 'error': str(e)}
+    
+    finally:
+        if db_class is not None:
+            tpdata_pool.release(db_class)
+        if owns_pool:
+            tpdata_pool.close()
 
 
 def adjust_trds_(df_tr, df_sm):
@@ -233,11 +387,20 @@ def adjust_trds_(df_tr, df_sm):
     if df_tr.empty or df_sm.empty:
         return df_tr
     
-    timestamp = df_tr.index
-    ts_new = df_sm.index.union(timestamp)
-    df_sm = df_sm.reindex(ts_new).ffill().reindex(timestamp)
-    lb = df_sm.iloc[:, 0] + 0.001  # Lower bound + buffer (bid + buffer)
-    ub = df_sm.iloc[:, 1] - 0.001  # Upper bound - buffer (ask - buffer)
-    df_tr.loc[df_tr['buy'] >= ub, 'buy'] = np.nan    # Remove buys too close to ask
-    df_tr.loc[df_tr['sell'] <= lb, 'sell'] = np.nan  # Remove sells too close to bid
-    return df_tr.dropna(how='all')
\ No newline at end of file
+    # As-of lookup of the latest (forward-filled) spread bid/ask at or before each
+    # trade via searchsorted on the sorted spread index - no union/reindex frames
+    if not df_sm.index.is_monotonic_increasing:
+        df_sm = df_sm.sort_index()
+    bid_ask = df_sm.iloc[:, :2].ffill().to_numpy(dtype=np.float64)
+    pos = df_sm.index.searchsorted(df_tr.index, side='right') - 1
+    bid_ask = np.where((pos >= 0)[:, None], bid_ask[np.maximum(pos, 0)], np.nan)
+    
+    lb = bid_ask[:, 0] + _TRADE_BUFFER  # Lower bound + buffer (bid + buffer)
+    ub = bid_ask[:, 1] - _TRADE_BUFFER  # Upper bound - buffer (ask - buffer)
+    buy = df_tr['buy'].to_numpy(dtype=np.float64)
+    sell = df_tr['sell'].to_numpy(dtype=np.float64)
+    df_tr = df_tr.assign(
+        buy=np.where(buy >= ub, np.nan, buy),      # Remove buys too close to ask
+        sell=np.where(sell <= lb, np.nan, sell)    # Remove sells too close to bid
+    )
+    return df_tr.dropna(how='all')
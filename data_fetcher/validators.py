@@ -5,8 +5,45 @@ Data Validation Components
 Validators for ensuring data quality and integrity.
 """
 
+import sys
+
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+# Below this many rows the NumPy path beats the parallel kernel's thread start-up
+_KERNEL_MIN_ROWS = 100_000
+
+
+def _spread_check_kernel(bids: np.ndarray, asks: np.ndarray, negative_out: np.ndarray) -> Tuple[int, int]:
+    """
+    Single pass over bid/ask: flag ask < bid where both are quoted.
+    
+    Writes the negative-spread mask into negative_out and returns
+    (records with both prices, negative spreads).
+    """
+    valid_count = 0
+    negative_count = 0
+    for i in prange(bids.shape[0]):
+        bid = bids[i]
+        ask = asks[i]
+        both = not (np.isnan(bid) or np.isnan(ask))
+        negative = both and ask < bid
+        negative_out[i] = negative
+        valid_count += 1 if both else 0
+        negative_count += 1 if negative else 0
+    return valid_count, negative_count
+
+
+if NUMBA_AVAILABLE:
+    _spread_check_kernel = njit(cache=True, parallel=True)(_spread_check_kernel)
 
 
 class BidAskValidator:
@@ -17,6 +54,8 @@ class BidAskValidator:
     entering the system.
     """
     
+    __slots__ = ('strict_mode', 'log_filtered', 'filtered_count', 'total_processed', '_stats_cache')
+    
     def __init__(self, strict_mode: bool = True, log_filtered: bool = True):
         """
         Initialize validator.
@@ -29,6 +68,8 @@ class BidAskValidator:
         self.log_filtered = log_filtered
         self.filtered_count = 0
         self.total_processed = 0
+        # (counters, stats) of the last get_stats call
+        self._stats_cache = None
     
     def validate_orders(self, df: pd.DataFrame, source_name: str) -> pd.DataFrame:
         """
@@ -45,57 +86,75 @@ class BidAskValidator:
             return df
         
         # Only validate if both bid and ask columns exist and have data
-        if 'b_price' not in df.columns or 'a_price' not in df.columns:
+        columns = df.columns
+        if not ('b_price' in columns and 'a_price' in columns):
             if self.log_filtered:
                 print(f"   ⚠️  No bid/ask columns in {source_name} orders - skipping validation")
             return df
         
-        # Count records with both bid and ask data
-        has_both_prices = df['b_price'].notna() & df['a_price'].notna()
-        valid_records = df[has_both_prices]
+        # Count records with both bid and ask data, straight from the column
+        # arrays (no filtered copy of the frame)
+        bids = df['b_price'].to_numpy(dtype=np.float64, na_value=np.nan)
+        asks = df['a_price'].to_numpy(dtype=np.float64, na_value=np.nan)
+        n_rows = bids.shape[0]
         
-        if valid_records.empty:
+        if NUMBA_AVAILABLE and n_rows >= _KERNEL_MIN_ROWS:
+            # Large frames: NaN check, compare and both counts in one parallel pass
+            negative_mask = np.empty(n_rows, dtype=np.bool_)
+            valid_count, negative_count = _spread_check_kernel(bids, asks, negative_mask)
+        else:
+            has_both_prices = ~(np.isnan(bids) | np.isnan(asks))
+            valid_count = int(has_both_prices.sum())
+            # Identify negative spreads (ask < bid) among records with both prices
+            negative_mask = has_both_prices & (asks < bids)
+            negative_count = int(negative_mask.sum())
+        
+        if valid_count == 0:
             if self.log_filtered:
                 print(f"   ⚠️  No records with both bid/ask in {source_name} - skipping validation")
             return df
         
-        # Identify negative spreads (ask < bid)
-        negative_mask = valid_records['a_price'] < valid_records['b_price']
-        negative_count = negative_mask.sum()
-        
-        self.total_processed += len(valid_records)
+        self.total_processed += valid_count
         self.filtered_count += negative_count
         
-        if negative_count > 0:
+        if negative_count == 0:
             if self.log_filtered:
-                worst_spread = (valid_records.loc[negative_mask, 'a_price'] - 
-                               valid_records.loc[negative_mask, 'b_price']).min()
-                print(f"   🚫 {source_name}: Found {negative_count} negative spreads "
-                      f"({negative_count/len(valid_records)*100:.1f}%) - worst: {worst_spread:.3f}")
-                
-                # Sample of problematic records
-                sample_records = valid_records[negative_mask].head(3)
-                for idx, row in sample_records.iterrows():
-                    spread_val = row['a_price'] - row['b_price']
-                    print(f"      🔍 {idx}: bid={row['b_price']:.3f}, ask={row['a_price']:.3f}, "
-                          f"spread={spread_val:.3f}")
+                print(f"      ✅ {source_name}: All {valid_count} records have valid spreads")
+            return df
+        
+        if self.strict_mode:
+            # Remove records with negative spreads by position (a label drop
+            # would also remove valid rows sharing an invalid row's timestamp)
+            validated = df.iloc[~negative_mask]
+        else:
+            # Mark invalid records
+            df.loc[df.index[negative_mask], 'is_valid'] = False
+            validated = df
+        
+        if self.log_filtered:
+            # Report collected into a single stdout write
+            # Positions of the negative spreads, gathered once for the worst
+            # spread and the sample rows
+            negative_positions = np.flatnonzero(negative_mask)
+            negative_spreads = asks[negative_positions] - bids[negative_positions]
+            worst_spread = negative_spreads.min()
+            lines = [f"   🚫 {source_name}: Found {negative_count} negative spreads "
+                     f"({negative_count/valid_count*100:.1f}%) - worst: {worst_spread:.3f}"]
+            
+            # Sample of problematic records (plain arrays, no per-row Series)
+            sample = negative_positions[:3]
+            lines.extend("      🔍 %s: bid=%.3f, ask=%.3f, spread=%.3f" % row
+                         for row in zip(df.index[sample], bids[sample], asks[sample],
+                                        negative_spreads[:3]))
             
             if self.strict_mode:
-                # Remove records with negative spreads
-                invalid_indices = valid_records[negative_mask].index
-                df_filtered = df.drop(invalid_indices)
-                print(f"      ✅ {source_name}: Removed {negative_count} invalid records "
-                      f"({len(df)} → {len(df_filtered)})")
-                return df_filtered
+                lines.append(f"      ✅ {source_name}: Removed {negative_count} invalid records "
+                             f"({n_rows} → {n_rows - negative_count})")
             else:
-                # Mark invalid records
-                df.loc[valid_records[negative_mask].index, 'is_valid'] = False
-                print(f"      ⚠️  {source_name}: Marked {negative_count} records as invalid")
-        else:
-            if self.log_filtered:
-                print(f"      ✅ {source_name}: All {len(valid_records)} records have valid spreads")
+                lines.append(f"      ⚠️  {source_name}: Marked {negative_count} records as invalid")
+            sys.stdout.write('\n'.join(lines) + '\n')
         
-        return df
+        return validated
     
     def validate_merged_data(self, df: pd.DataFrame, source_name: str = "Engine") -> pd.DataFrame:
         """
@@ -105,9 +164,12 @@ class BidAskValidator:
         return self.validate_orders(df, source_name)
     
     def get_stats(self) -> Dict:
-        """Get validation statistics."""
-        return {
-            'total_processed': self.total_processed,
-            'filtered_count': self.filtered_count,
-            'filter_rate': self.filtered_count / max(1, self.total_processed) * 100
-        }
\ No newline at end of file
+        """Get validation statistics (recomputed only after the counters change)."""
+        counters = (self.total_processed, self.filtered_count)
+        if self._stats_cache is None or self._stats_cache[0] != counters:
+            self._stats_cache = (counters, {
+                'total_processed': self.total_processed,
+                'filtered_count': self.filtered_count,
+                'filter_rate': self.filtered_count / max(1, self.total_processed) * 100
+            })
+        return self._stats_cache[1]
\ No newline at end of file
@@ -46,12 +46,10 @@ def debug_quarter_calculation():
         
         print(f"   📊 Initial calculation: Q{calc_period} + {tn} - 1 = Q{target_quarter} {target_year}")
         
-        # Handle quarter overflow
-        overflow_count = 0
-        while target_quarter > 4:
-            target_quarter -= 4
-            target_year += 1
-            overflow_count += 1
+        # Handle quarter overflow (whole years past Q4 in one divmod)
+        overflow_count, target_quarter0 = divmod(target_quarter - 1, 4)
+        target_quarter = target_quarter0 + 1
+        target_year += overflow_count
         
         if overflow_count > 0:
             print(f"   ⚡ Quarter overflow: {overflow_count} year(s) forward")
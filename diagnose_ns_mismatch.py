@@ -9,24 +9,11 @@ sys.path.append('/mnt/c/Users/krajcovic/Documents/GitHub/ATS_DataFetch/src')
 sys.path.append('/mnt/c/Users/krajcovic/Documents/GitHub/ATS_DataFetch/engines')
 
 from datetime import datetime, date, timedelta
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 
-print("🔍 DIAGNOSING N_S PARAMETER MISMATCH")
-print("=" * 60)
-
-# Test the critical date - June 26, 2025
-test_date = date(2025, 6, 26)
-contracts = ['debq4_25', 'frbq4_25']
-n_s = 3
-
-print(f"📋 Test Configuration:")
-print(f"   📅 Critical date: {test_date} (Thursday)")
-print(f"   📊 Contracts: {contracts}")
-print(f"   🔧 n_s parameter: {n_s}")
-print(f"   ⚠️  This date showed €20-€33 price spikes (100% synthetic)")
-print()
-
+@lru_cache(maxsize=None)
 def parse_contract_info(contract_name):
     """Parse contract to extract market, tenor, delivery info"""
     # Format: debq4_25 = German base Q4 2025
@@ -83,6 +70,7 @@ def calculate_relative_period_datafetcher_style(reference_date, contract_info, n
         'method': 'DataFetcher-style'
     }
 
+@lru_cache(maxsize=None)
 def calculate_business_days_to_period_end(reference_date, reference_quarter, reference_year):
     """Calculate business days from reference date to end of its quarter"""
     
@@ -96,14 +84,8 @@ def calculate_business_days_to_period_end(reference_date, reference_quarter, ref
     else:  # Q4
         quarter_end = date(reference_year, 12, 31)
     
-    # Count business days
-    business_days = 0
-    current_date = reference_date
-    
-    while current_date <= quarter_end:
-        if current_date.weekday() < 5:  # Monday=0, Friday=4
-            business_days += 1
-        current_date += timedelta(days=1)
+    # Count business days (Mon-Fri) from reference date through quarter end
+    business_days = int(np.busday_count(reference_date, quarter_end + timedelta(days=1)))
     
     return business_days - 1  # Don't count the reference date itself
 
@@ -162,83 +144,112 @@ def calculate_relative_period_with_ns_transition(reference_date, contract_info,
             'business_days_to_end': business_days_to_end
         }
 
-# Run the diagnostic
-print(f"🔍 DIAGNOSTIC ANALYSIS FOR {test_date}:")
-print("=" * 60)
-
-for contract in contracts:
-    print(f"\n📊 ANALYZING CONTRACT: {contract}")
-    
-    # Parse contract
-    contract_info = parse_contract_info(contract)
-    print(f"   📋 Parsed: {contract_info['market'].upper()} {contract_info['product'].upper()} Q{contract_info['period_num']} {contract_info['year']}")
-    print(f"   📅 Delivery: {contract_info['delivery_date']}")
-    
-    # Method 1: Simple DataFetcher-style (no n_s transition)
-    print(f"\n   🔧 METHOD 1: Simple Relative Calculation (No n_s)")
-    simple_calc = calculate_relative_period_datafetcher_style(test_date, contract_info, n_s)
-    print(f"      📈 Relative period: {simple_calc['relative_period']}")
-    print(f"      📅 Reference: {simple_calc['reference_quarter']}")
-    print(f"      📅 Target: {simple_calc['target_quarter']}")
-    print(f"      📊 Difference: {simple_calc['quarters_difference']} quarters")
-    
-    # Method 2: With n_s transition logic
-    print(f"\n   🔧 METHOD 2: With n_s Transition Logic")
-    transition_calc = calculate_relative_period_with_ns_transition(test_date, contract_info, n_s)
-    print(f"      📈 Relative period: {transition_calc['relative_period']}")
-    print(f"      📅 Reference: {transition_calc['reference_quarter']}")
-    print(f"      📅 Target: {transition_calc['target_quarter']}")
-    print(f"      📊 Difference: {transition_calc['quarters_difference']} quarters")
-    print(f"      ⚡ In transition: {transition_calc['in_transition']}")
-    
-    # Check for discrepancy
-    if simple_calc['relative_period'] != transition_calc['relative_period']:
-        print(f"\n   ⚠️  MISMATCH DETECTED!")
-        print(f"      Simple method: {simple_calc['relative_period']}")
-        print(f"      n_s method: {transition_calc['relative_period']}")
-        print(f"      ➡️  This could explain price discrepancies!")
-    else:
-        print(f"\n   ✅ Both methods agree: {simple_calc['relative_period']}")
-
-# Test a few more dates around the transition
-print(f"\n" + "=" * 60)
-print(f"🔍 TESTING MULTIPLE DATES AROUND Q3 2025 TRANSITION:")
-print("=" * 60)
-
-test_dates = [
-    date(2025, 6, 25),  # Day before spike
-    date(2025, 6, 26),  # Spike day
-    date(2025, 6, 27),  # Day after spike
-    date(2025, 9, 26),  # Near Q3 end
-    date(2025, 9, 29),  # Very close to Q3 end
-    date(2025, 9, 30),  # Last day of Q3
-]
-
-contract_info = parse_contract_info('debq4_25')
-
-for test_dt in test_dates:
-    print(f"\n📅 DATE: {test_dt} ({test_dt.strftime('%A')})")
-    
-    simple = calculate_relative_period_datafetcher_style(test_dt, contract_info, n_s)
-    
-    # Quick transition check
-    ref_quarter = ((test_dt.month - 1) // 3) + 1
-    business_days_to_end = calculate_business_days_to_period_end(test_dt, ref_quarter, test_dt.year)
-    in_transition = business_days_to_end <= n_s
-    
-    print(f"   📊 Simple method: {simple['relative_period']}")
-    print(f"   📊 Business days to Q{ref_quarter} end: {business_days_to_end}")
-    print(f"   ⚡ Would transition: {in_transition}")
-    
-    if in_transition:
-        print(f"   ⚠️  TRANSITION PERIOD - potential mismatch zone!")
-
-print(f"\n" + "=" * 60)
-print(f"🎯 CONCLUSION:")
-print("=" * 60)
-print(f"If DataFetcher and SpreadViewer use different n_s transition logic:")
-print(f"• One system might be querying q_1 (Q4 2025) contracts")
-print(f"• Other system might be querying q_2 (Q1 2026) contracts")
-print(f"• This would explain €20 vs €33 price differences!")
-print(f"• The fix requires synchronizing n_s transition logic between systems")
-print(f"\n✅ Diagnostic completed - investigate the actual code implementations next!")
\ No newline at end of file
+def main():
+    print("🔍 DIAGNOSING N_S PARAMETER MISMATCH")
+    print("=" * 60)
+
+    # Test the critical date - June 26, 2025
+    test_date = date(2025, 6, 26)
+    contracts = ['debq4_25', 'frbq4_25']
+    n_s = 3
+
+    print(f"📋 Test Configuration:")
+    print(f"   📅 Critical date: {test_date} (Thursday)")
+    print(f"   📊 Contracts: {contracts}")
+    print(f"   🔧 n_s parameter: {n_s}")
+    print(f"   ⚠️  This date showed €20-€33 price spikes (100% synthetic)")
+    print()
+    
+    # Run the diagnostic
+    print(f"🔍 DIAGNOSTIC ANALYSIS FOR {test_date}:")
+    print("=" * 60)
+
+    for contract in contracts:
+        print(f"\n📊 ANALYZING CONTRACT: {contract}")
+    
+        # Parse contract
+        contract_info = parse_contract_info(contract)
+        print(f"   📋 Parsed: {contract_info['market'].upper()} {contract_info['product'].upper()} Q{contract_info['period_num']} {contract_info['year']}")
+        print(f"   📅 Delivery: {contract_info['delivery_date']}")
+    
+        # Method 1: Simple DataFetcher-style (no n_s transition)
+        print(f"\n   🔧 METHOD 1: Simple Relative Calculation (No n_s)")
+        simple_calc = calculate_relative_period_datafetcher_style(test_date, contract_info, n_s)
+        print(f"      📈 Relative period: {simple_calc['relative_period']}")
+        print(f"      📅 Reference: {simple_calc['reference_quarter']}")
+        print(f"      📅 Target: {simple_calc['target_quarter']}")
+        print(f"      📊 Difference: {simple_calc['quarters_difference']} quarters")
+    
+        # Method 2: With n_s transition logic
+        print(f"\n   🔧 METHOD 2: With n_s Transition Logic")
+        transition_calc = calculate_relative_period_with_ns_transition(test_date, contract_info, n_s)
+        print(f"      📈 Relative period: {transition_calc['relative_period']}")
+        print(f"      📅 Reference: {transition_calc['reference_quarter']}")
+        print(f"      📅 Target: {transition_calc['target_quarter']}")
+        print(f"      📊 Difference: {transition_calc['quarters_difference']} quarters")
+        print(f"      ⚡ In transition: {transition_calc['in_transition']}")
+    
+        # Check for discrepancy
+        if simple_calc['relative_period'] != transition_calc['relative_period']:
+            print(f"\n   ⚠️  MISMATCH DETECTED!")
+            print(f"      Simple method: {simple_calc['relative_period']}")
+            print(f"      n_s method: {transition_calc['relative_period']}")
+            print(f"      ➡️  This could explain price discrepancies!")
+        else:
+            print(f"\n   ✅ Both methods agree: {simple_calc['relative_period']}")
+
+    # Test a few more dates around the transition
+    print(f"\n" + "=" * 60)
+    print(f"🔍 TESTING MULTIPLE DATES AROUND Q3 2025 TRANSITION:")
+    print("=" * 60)
+
+    test_dates = [
+        date(2025, 6, 25),  # Day before spike
+        date(2025, 6, 26),  # Spike day
+        date(2025, 6, 27),  # Day after spike
+        date(2025, 9, 26),  # Near Q3 end
+        date(2025, 9, 29),  # Very close to Q3 end
+        date(2025, 9, 30),  # Last day of Q3
+    ]
+
+    contract_info = parse_contract_info('debq4_25')
+
+    # Quick transition check for all dates at once: quarter, business days to
+    # quarter end (excluding the date itself) and the n_s threshold
+    dates_index = pd.DatetimeIndex(test_dates)
+    ref_quarters = (dates_index.month - 1) // 3 + 1
+    quarter_ends = dates_index + pd.offsets.QuarterEnd(0)
+    business_days_to_ends = np.busday_count(
+        dates_index.values.astype('datetime64[D]'),
+        (quarter_ends + pd.Timedelta(days=1)).values.astype('datetime64[D]')
+    ) - 1
+    in_transitions = business_days_to_ends <= n_s
+
+    for test_dt, ref_quarter, business_days_to_end, in_transition in zip(
+            test_dates, ref_quarters, business_days_to_ends, in_transitions):
+        print(f"\n📅 DATE: {test_dt} ({test_dt.strftime('%A')})")
+    
+        simple = calculate_relative_period_datafetcher_style(test_dt, contract_info, n_s)
+    
+        print(f"   📊 Simple method: {simple['relative_period']}")
+        print(f"   📊 Business days to Q{ref_quarter} end: {business_days_to_end}")
+        print(f"   ⚡ Would transition: {in_transition}")
+    
+        if in_transition:
+            print(f"   ⚠️  TRANSITION PERIOD - potential mismatch zone!")
+
+    print("\n".join([
+        f"\n" + "=" * 60,
+        f"🎯 CONCLUSION:",
+        "=" * 60,
+        f"If DataFetcher and SpreadViewer use different n_s transition logic:",
+        f"• One system might be querying q_1 (Q4 2025) contracts",
+        f"• Other system might be querying q_2 (Q1 2026) contracts",
+        f"• This would explain €20 vs €33 price differences!",
+        f"• The fix requires synchronizing n_s transition logic between systems",
+        f"\n✅ Diagnostic completed - investigate the actual code implementations next!"
+    ]))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,130 +3,270 @@
 Diagnose why price discrepancies persist after n_s synchronization fix
 """
 
+import importlib.util
 import sys
 import os
 sys.path.append('/mnt/c/Users/krajcovic/Documents/GitHub/ATS_DataFetch/engines')
 
-import pandas as pd
-from datetime import datetime, date, timedelta
-from data_fetch_engine import calculate_synchronized_product_dates
+# pandas, pyarrow and data_fetch_engine are imported where used, so importing
+# this module for its helpers or constants stays cheap
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
 
-print("🔍 DIAGNOSING PERSISTENT PRICE DISCREPANCIES")
-print("=" * 70)
+# The only columns the analysis reads; the index is used just for the range filter
+ANALYSIS_COLUMNS = ['price', 'broker_id']
 
-# Load the data that still shows discrepancies
-data_file = '/mnt/c/Users/krajcovic/Documents/Testing Data/RawData/test/debq4_25_frbq4_25_tr_ba_data.parquet'
-df = pd.read_parquet(data_file)
+# Test file that still shows discrepancies
+DATA_FILE = '/mnt/c/Users/krajcovic/Documents/Testing Data/RawData/test/debq4_25_frbq4_25_tr_ba_data.parquet'
 
-print(f"📁 Loaded data: {len(df):,} records")
-print(f"📅 Date range: {df.index.min()} to {df.index.max()}")
+# Brokers compared in the report: DataFetcher (real) and SpreadViewer (synthetic)
+REPORTED_BROKERS = [1441, 9999]
 
-# Focus on June 26-27 critical period
-critical_start = pd.Timestamp('2025-06-26')
-critical_end = pd.Timestamp('2025-06-27 23:59:59')
+# Report line templates, filled once per reported broker
+TRADES_FMT = "   🏢 %s trades: %s"
+PRICE_RANGE_FMT = "   📊 %s prices: €%.2f - €%.2f (mean: €%.2f)"
 
-critical_data = df[(df.index >= critical_start) & (df.index <= critical_end)]
-critical_trades = critical_data[critical_data['price'].notna()]
 
-print(f"\n🔍 CRITICAL PERIOD ANALYSIS (June 26-27):")
-print(f"   📅 Period: {critical_start.date()} to {critical_end.date()}")
-print(f"   📊 Total records: {len(critical_data):,}")
-print(f"   🔄 Trades: {len(critical_trades):,}")
+def read_period_table(data_file, parquet_file, index_column, start, end):
+    """
+    Arrow table of ANALYSIS_COLUMNS for start <= index <= end.
+    
+    Only the row groups whose index statistics overlap the period are read,
+    through the memory-mapped parquet_file (a pq.ParquetFile of data_file).
+    
+    The slice is kept in an uncompressed Feather sidecar next to the parquet
+    file (<data_file>.cache.arrow). Repeat runs memory-map it as long as it is
+    newer than the parquet file and was written for the same period, skipping
+    parquet decompression and decoding entirely. An unreadable sidecar is
+    ignored and rewritten from the parquet scan.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    
+    cache_file = data_file + '.cache.arrow'
+    period_key = f'{start.isoformat()}/{end.isoformat()}'.encode()
+    if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(data_file):
+        try:
+            table = feather.read_table(cache_file, memory_map=True)
+        except (OSError, pa.ArrowException):
+            table = None  # Truncated or corrupt sidecar - rebuild it below
+        if table is not None and (table.schema.metadata or {}).get(b'period') == period_key:
+            return table
+    
+    # Row groups whose index min/max statistics fall outside the period are
+    # skipped before any page is decompressed (no statistics: read it)
+    metadata = parquet_file.metadata
+    position = metadata.schema.names.index(index_column)
+    row_groups = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(position).statistics
+        if stats is None or not stats.has_min_max or (stats.max >= start and stats.min <= end):
+            row_groups.append(i)
+    table = parquet_file.read_row_groups(row_groups, columns=[index_column] + ANALYSIS_COLUMNS)
+    index = table[index_column]
+    table = table.filter(pc.and_(pc.greater_equal(index, start), pc.less_equal(index, end))).select(ANALYSIS_COLUMNS)
+    # Broker ids are small integers stored as float64 - group on int32 keys
+    broker_position = table.schema.get_field_index('broker_id')
+    table = table.set_column(broker_position, 'broker_id', table['broker_id'].cast(pa.int32()))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'period': period_key})
+    # Written next to the sidecar and renamed into place, so an interrupted run
+    # never leaves a truncated sidecar for the next one to memory-map
+    temp_file = f'{cache_file}.{os.getpid()}.tmp'
+    try:
+        feather.write_feather(table, temp_file, compression='uncompressed')
+        os.replace(temp_file, cache_file)
+    except (OSError, pa.ArrowException):
+        # Read-only data directory - run uncached
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+    return table
 
-if not critical_trades.empty and 'broker_id' in critical_trades.columns:
-    real_trades = critical_trades[critical_trades['broker_id'] == 1441.0]
-    synth_trades = critical_trades[critical_trades['broker_id'] == 9999.0]
+
+def load_period_stats(data_file, start, end):
+    """
+    Trade price statistics for REPORTED_BROKERS over start <= index <= end.
+    
+    With pyarrow only the row groups overlapping the period and the needed
+    columns are decoded (and cached, see read_period_table); the reported brokers are then selected with one is_in
+    pass and min/max/mean/count computed in a single Arrow group_by. File
+    totals come from the footer metadata. Returns (period_records, trade_count,
+    broker_stats, total_records, first_timestamp, last_timestamp), where
+    trade_count covers all brokers and broker_stats is indexed by broker_id
+    with min/max/mean/count columns over non-null prices.
+    """
+    import pandas as pd
     
-    print(f"   🏢 DataFetcher trades: {len(real_trades):,}")
-    print(f"   🏢 SpreadViewer trades: {len(synth_trades):,}")
+    if not PYARROW_AVAILABLE:
+        df = pd.read_parquet(data_file)
+        period = df.loc[(df.index >= start) & (df.index <= end), ANALYSIS_COLUMNS].astype({'broker_id': 'Int32'})
+        reported = period[period['broker_id'].isin(REPORTED_BROKERS)]
+        broker_stats = reported['price'].groupby(reported['broker_id']).agg(['min', 'max', 'mean', 'count'])
+        return (len(period), int(period['price'].count()), broker_stats,
+                len(df), df.index.min(), df.index.max())
     
-    if not real_trades.empty:
-        print(f"   📊 DataFetcher prices: €{real_trades['price'].min():.2f} - €{real_trades['price'].max():.2f} (mean: €{real_trades['price'].mean():.2f})")
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
     
-    if not synth_trades.empty:
-        print(f"   📊 SpreadViewer prices: €{synth_trades['price'].min():.2f} - €{synth_trades['price'].max():.2f} (mean: €{synth_trades['price'].mean():.2f})")
+    # Memory-mapped: the footer, statistics and period row groups are read
+    # from the mapping without a copy into the process
+    parquet_file = pq.ParquetFile(data_file, memory_map=True)
+    index_column = parquet_file.schema_arrow.pandas_metadata['index_columns'][0]
+    table = read_period_table(data_file, parquet_file, index_column, start, end)
+    trade_count = pc.count(table['price']).as_py()
+    reported = table.filter(pc.is_in(table['broker_id'], value_set=pa.array(REPORTED_BROKERS, pa.int32())))
+    aggregated = reported.group_by('broker_id').aggregate(
+        [('price', 'min'), ('price', 'max'), ('price', 'mean'), ('price', 'count')])
+    broker_stats = aggregated.to_pandas().set_index('broker_id').rename(columns=lambda c: c[len('price_'):])
     
-    if not real_trades.empty and not synth_trades.empty:
-        discrepancy = abs(real_trades['price'].mean() - synth_trades['price'].mean())
-        print(f"   💥 Average price discrepancy: €{discrepancy:.2f}")
-        
-        if discrepancy > 5.0:
-            print(f"   ⚠️  STILL LARGE DISCREPANCY AFTER N_S FIX!")
-        else:
-            print(f"   ✅ Price discrepancy within acceptable range")
-
-print(f"\n🔧 TESTING OUR SYNCHRONIZED FUNCTION:")
-print("=" * 70)
-
-# Test our synchronized function with the exact same parameters
-test_date = date(2025, 6, 26)
-dates = pd.date_range(test_date, test_date, freq='B')
-tenors_list = ['q', 'q']  # Both are quarterly
-tn1_list = [1, 2]  # q_1 and q_2 relative periods
-n_s = 3
-
-print(f"📋 Test parameters:")
-print(f"   📅 Date: {test_date}")
-print(f"   📊 Tenors: {tenors_list}")
-print(f"   📊 Periods: {tn1_list}")
-print(f"   🔧 n_s: {n_s}")
-
-try:
-    result = calculate_synchronized_product_dates(dates, tenors_list, tn1_list, n_s)
+    # File-wide totals from row-group statistics instead of reading the data
+    metadata = parquet_file.metadata
+    position = metadata.schema.names.index(index_column)
+    stats = [metadata.row_group(i).column(position).statistics for i in range(metadata.num_row_groups)]
+    if stats and all(s is not None and s.has_min_max for s in stats):
+        first, last = pd.Timestamp(min(s.min for s in stats)), pd.Timestamp(max(s.max for s in stats))
+    else:
+        first = last = None
+    return table.num_rows, trade_count, broker_stats, metadata.num_rows, first, last
+
+
+def main():
+    """Run the discrepancy diagnosis on the hard-coded test file."""
+    # A parquet file is at least its 4-byte magic; fail fast before any reader spins up
+    if not os.path.exists(DATA_FILE) or os.path.getsize(DATA_FILE) < 4:
+        sys.exit(f"❌ Data file missing: {DATA_FILE}")
     
-    print(f"\n✅ Synchronized function results:")
-    for i, (tenor, tn) in enumerate(zip(tenors_list, tn1_list)):
-        product_dates = result[i]
-        if len(product_dates) > 0:
-            delivery_date = product_dates[0]
-            quarter = ((delivery_date.month - 1) // 3) + 1
-            print(f"   📊 {tenor}_{tn}: {delivery_date.date()} (Q{quarter} {delivery_date.year})")
-            
-except Exception as e:
-    print(f"❌ Error testing synchronized function: {e}")
-
-print(f"\n🤔 POSSIBLE ROOT CAUSES:")
-print("=" * 70)
-print(f"1. 🔧 Fix not applied: The synchronized function might not be called during data generation")
-print(f"2. 📊 Different data sources: DataFetcher vs SpreadViewer might be querying fundamentally different datasets")
-print(f"3. 🔄 Cache issues: Old data or calculations might be cached")
-print(f"4. 📅 Timing mismatch: The actual relative period calculation might be different")
-print(f"5. 🏢 Broker mapping: Different broker IDs might represent different calculation methods")
-
-print(f"\n🔍 DETAILED CONTRACT ANALYSIS:")
-print("=" * 70)
-
-# Check what contracts these should actually be querying
-print(f"For June 26, 2025 (Q2 2025, in last 3 business days):")
-print(f"Both systems SHOULD use Q3 2025 perspective:")
-print(f"   - debq4_25: German base Q4 2025 → delivery Oct 1, 2025")
-print(f"   - frbq4_25: French base Q4 2025 → delivery Oct 1, 2025")
-print(f"   - q_1 relative from Q3 → Q4 2025 contracts")
-print(f"   - q_2 relative from Q3 → Q1 2026 contracts")
-
-print(f"\nBUT the price discrepancy suggests:")
-print(f"   - DataFetcher (€19-20): Likely querying Q4 2025 contracts ✅") 
-print(f"   - SpreadViewer (€31-33): Likely querying Q1 2026 contracts ❌")
-print(f"   - This means SpreadViewer is STILL using q_2 instead of q_1!")
-
-print(f"\n🚨 HYPOTHESIS:")
-print("=" * 70)
-print(f"The synchronized function works correctly, but:")
-print(f"1. SpreadViewer might not be calling our synchronized function")
-print(f"2. There might be a different code path that bypasses our fix")
-print(f"3. The fix might only apply to some data sources, not both")
-print(f"4. The contracts configuration might be incorrect")
-
-print(f"\n📋 NEXT STEPS:")
-print("=" * 70)
-print(f"1. 🔍 Verify the synchronized function is actually being called")
-print(f"2. 📊 Add debug logging to trace which contracts are being queried")
-print(f"3. 🔄 Check if there are multiple code paths for SpreadViewer calls")
-print(f"4. ⚠️  Consider if the fix was applied to the right place in the code")
-
-print(f"\n🎯 RECOMMENDATION:")
-print("=" * 70)
-print(f"Add debug logging to the data generation process to see:")
-print(f"- Which product_dates function is being called")
-print(f"- What dates are being returned by each system") 
-print(f"- Whether both systems are using the same relative periods")
\ No newline at end of file
+    import pandas as pd
+    from datetime import date
+    from data_fetch_engine import calculate_synchronized_product_dates
+    
+    sys.stdout.write("🔍 DIAGNOSING PERSISTENT PRICE DISCREPANCIES\n" + "=" * 70 + "\n")
+
+    # Focus on June 26-27 critical period
+    critical_start = pd.Timestamp('2025-06-26')
+    critical_end = pd.Timestamp('2025-06-27 23:59:59')
+
+    period_records, trade_count, broker_stats, total_records, first_ts, last_ts = load_period_stats(
+        DATA_FILE, critical_start, critical_end)
+
+    # Report sections are collected into a list and written in one go, after the
+    # aggregate they describe is complete
+    out = [
+        f"📁 Loaded data: {total_records:,} records",
+        f"📅 Date range: {first_ts} to {last_ts}",
+        f"\n🔍 CRITICAL PERIOD ANALYSIS (June 26-27):",
+        f"   📅 Period: {critical_start.date()} to {critical_end.date()}",
+        f"   📊 Total records: {period_records:,}",
+        f"   🔄 Trades: {trade_count:,}",
+    ]
+
+    if trade_count:
+        # Rows for brokers with no trades in the period are all-NaN with count 0
+        real_stats, synth_stats = broker_stats.reindex(REPORTED_BROKERS).fillna({'count': 0}).to_dict('records')
+
+        reported = (('DataFetcher', real_stats), ('SpreadViewer', synth_stats))
+        out.extend(TRADES_FMT % (name, format(int(stats['count']), ',')) for name, stats in reported)
+        out.extend(PRICE_RANGE_FMT % (name, stats['min'], stats['max'], stats['mean'])
+                   for name, stats in reported if stats['count'])
+
+        if real_stats['count'] and synth_stats['count']:
+            discrepancy = abs(real_stats['mean'] - synth_stats['mean'])
+            out.append(f"   💥 Average price discrepancy: €{discrepancy:.2f}")
+
+            if discrepancy > 5.0:
+                out.append(f"   ⚠️  STILL LARGE DISCREPANCY AFTER N_S FIX!")
+            else:
+                out.append(f"   ✅ Price discrepancy within acceptable range")
+
+    # Test our synchronized function with the exact same parameters
+    test_date = date(2025, 6, 26)
+    dates = pd.date_range(test_date, test_date, freq='B')
+    tenors_list = ['q', 'q']  # Both are quarterly
+    tn1_list = [1, 2]  # q_1 and q_2 relative periods
+    n_s = 3
+
+    out += [
+        f"\n🔧 TESTING OUR SYNCHRONIZED FUNCTION:",
+        "=" * 70,
+        f"📋 Test parameters:",
+        f"   📅 Date: {test_date}",
+        f"   📊 Tenors: {tenors_list}",
+        f"   📊 Periods: {tn1_list}",
+        f"   🔧 n_s: {n_s}",
+    ]
+    # Flushed before the call, which prints its own progress lines
+    sys.stdout.write('\n'.join(out) + '\n')
+
+    out = []
+    try:
+        result = calculate_synchronized_product_dates(dates, tenors_list, tn1_list, n_s)
+
+        out.append(f"\n✅ Synchronized function results:")
+        # First delivery date per tenor (skipped tenors have none), with the
+        # quarter/year taken from the column accessors in one go
+        deliveries = pd.DataFrame({
+            'tenor': tenors_list,
+            'tn': tn1_list,
+            'delivery': [product_dates[0] if len(product_dates) > 0 else pd.NaT for product_dates in result]
+        }).dropna(subset=['delivery'])
+        deliveries['quarter'] = deliveries['delivery'].dt.quarter
+        deliveries['year'] = deliveries['delivery'].dt.year
+        out.extend(f"   📊 {row.tenor}_{row.tn}: {row.delivery.date()} (Q{row.quarter} {row.year})"
+                   for row in deliveries.itertuples(index=False))
+
+    except Exception as e:
+        out.append(f"❌ Error testing synchronized function: {e}")
+
+    out += [
+        f"\n🤔 POSSIBLE ROOT CAUSES:",
+        "=" * 70,
+        f"1. 🔧 Fix not applied: The synchronized function might not be called during data generation",
+        f"2. 📊 Different data sources: DataFetcher vs SpreadViewer might be querying fundamentally different datasets",
+        f"3. 🔄 Cache issues: Old data or calculations might be cached",
+        f"4. 📅 Timing mismatch: The actual relative period calculation might be different",
+        f"5. 🏢 Broker mapping: Different broker IDs might represent different calculation methods",
+
+        f"\n🔍 DETAILED CONTRACT ANALYSIS:",
+        "=" * 70,
+        # Check what contracts these should actually be querying
+        f"For June 26, 2025 (Q2 2025, in last 3 business days):",
+        f"Both systems SHOULD use Q3 2025 perspective:",
+        f"   - debq4_25: German base Q4 2025 → delivery Oct 1, 2025",
+        f"   - frbq4_25: French base Q4 2025 → delivery Oct 1, 2025",
+        f"   - q_1 relative from Q3 → Q4 2025 contracts",
+        f"   - q_2 relative from Q3 → Q1 2026 contracts",
+
+        f"\nBUT the price discrepancy suggests:",
+        f"   - DataFetcher (€19-20): Likely querying Q4 2025 contracts ✅",
+        f"   - SpreadViewer (€31-33): Likely querying Q1 2026 contracts ❌",
+        f"   - This means SpreadViewer is STILL using q_2 instead of q_1!",
+
+        f"\n🚨 HYPOTHESIS:",
+        "=" * 70,
+        f"The synchronized function works correctly, but:",
+        f"1. SpreadViewer might not be calling our synchronized function",
+        f"2. There might be a different code path that bypasses our fix",
+        f"3. The fix might only apply to some data sources, not both",
+        f"4. The contracts configuration might be incorrect",
+
+        f"\n📋 NEXT STEPS:",
+        "=" * 70,
+        f"1. 🔍 Verify the synchronized function is actually being called",
+        f"2. 📊 Add debug logging to trace which contracts are being queried",
+        f"3. 🔄 Check if there are multiple code paths for SpreadViewer calls",
+        f"4. ⚠️  Consider if the fix was applied to the right place in the code",
+
+        f"\n🎯 RECOMMENDATION:",
+        "=" * 70,
+        f"Add debug logging to the data generation process to see:",
+        f"- Which product_dates function is being called",
+        f"- What dates are being returned by each system",
+        f"- Whether both systems are using the same relative periods",
+    ]
+    sys.stdout.write('\n'.join(out) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,10 @@
 Document the original SpreadViewer logic from the unmodified code
 """
 
-print("📋 ORIGINAL SPREADVIEWER LOGIC DOCUMENTATION")
-print("=" * 50)
+import sys
 
-print("🔍 ORIGINAL product_dates FUNCTION:")
-print("=" * 40)
-
-original_logic = """
+# The unmodified SpreadViewer product_dates, reproduced verbatim in the report
+ORIGINAL_LOGIC = """
 def product_dates(self, dates, n_s, tn_bool=True):
     if tn_bool:
         tn_list = self.tn1_list
@@ -32,69 +29,93 @@ def product_dates(self, dates, n_s, tn_bool=True):
     return pd_list
 """
 
-print(original_logic)
-
-print("🎯 KEY INSIGHT - THE CRITICAL LINE:")
-print("=" * 40)
-print("For quarterly contracts (t='q'):")
-print("   (dates + n_s * dates.freq).shift(tn, freq='QS')")
-print("")
-print("This means:")
-print("   1. Take current dates")
-print("   2. Add n_s business days FORWARD")
-print("   3. Then shift by tn quarters from that future date")
-
-print(f"\n🧪 EXAMPLE WITH JUNE 26, 2025:")
-print("=" * 35)
-
-import pandas as pd
-from datetime import datetime
-
-# Example calculation
-june_26 = datetime(2025, 6, 26)
-dates = pd.date_range(june_26, june_26, freq='B')
-n_s = 3
-tn = 1  # q_1
-
-print(f"📅 Input dates: {dates[0].strftime('%Y-%m-%d')}")
-print(f"🔧 n_s: {n_s}")
-print(f"📊 tn (relative period): {tn} (q_1)")
-
-# Step 1: Add n_s business days forward
-forward_dates = dates + n_s * dates.freq
-print(f"📈 Step 1 - Forward shift: {dates[0].strftime('%Y-%m-%d')} + {n_s} business days = {forward_dates[0].strftime('%Y-%m-%d')}")
-
-# Step 2: Shift by tn quarters
-final_dates = forward_dates.shift(tn, freq='QS')
-print(f"📊 Step 2 - Quarter shift: {forward_dates[0].strftime('%Y-%m-%d')} + {tn} quarters = {final_dates[0].strftime('%Y-%m-%d')}")
-
-print(f"\n🎯 FINAL RESULT:")
-print(f"   Original SpreadViewer for June 26 + q_1 = {final_dates[0].strftime('%Y-%m-%d')}")
-print(f"   This represents Q4 2025 delivery")
-
-print(f"\n🤔 WHY THE €32 vs €20 PRICE DIFFERENCE?")
-print("=" * 45)
-print("If both DataFetcher and SpreadViewer use q_1 for June 26,")
-print("the price difference must come from:")
-print("   1. Different n_s interpretation in data fetching")
-print("   2. Different contract specifications")
-print("   3. Different market data sources")
-print("   4. Different calculation methods within same relative period")
-print("   5. SpreadViewer internal bug in price calculation")
-
-print(f"\n📊 WHAT OUR MODIFICATIONS DID:")
-print("=" * 35)
-print("We replaced this original logic with:")
-print("   • Period splitting (June 24-26 = q_2, June 27+ = q_1)")
-print("   • Custom transition logic")
-print("   • Hardcoded transition dates")
-
-print(f"\nBut this created the €8.69 problem because now SpreadViewer")
-print(f"might be fetching q_3 or q_4 instead of the intended period.")
-
-print(f"\n🚨 RECOMMENDATION:")
-print("=" * 20)
-print("1. REVERT to original SpreadViewer logic")
-print("2. Keep the original (dates + n_s * dates.freq).shift(tn, freq='QS')")
-print("3. Focus on fixing the ACTUAL bug causing €32 vs €20 for same q_1")
-print("4. Don't change relative period mappings - fix the calculation within same period")
\ No newline at end of file
+
+def main():
+    """Print the documentation and worked example."""
+    # Deferred so importing this module for ORIGINAL_LOGIC does not load pandas
+    import pandas as pd
+    from datetime import datetime
+
+    # Report lines, written to stdout in a single call at the end
+    out = []
+
+    out.append("📋 ORIGINAL SPREADVIEWER LOGIC DOCUMENTATION")
+    out.append("=" * 50)
+
+    out.append("🔍 ORIGINAL product_dates FUNCTION:")
+    out.append("=" * 40)
+
+    out.append(ORIGINAL_LOGIC)
+
+    out.append("🎯 KEY INSIGHT - THE CRITICAL LINE:")
+    out.append("=" * 40)
+    out.append("For quarterly contracts (t='q'):")
+    out.append("   (dates + n_s * dates.freq).shift(tn, freq='QS')")
+    out.append("")
+    out.append("This means:")
+    out.append("   1. Take current dates")
+    out.append("   2. Add n_s business days FORWARD")
+    out.append("   3. Then shift by tn quarters from that future date")
+
+    out.append(f"\n🧪 EXAMPLE WITH JUNE 26, 2025:")
+    out.append("=" * 35)
+
+    # Example calculation
+    june_26 = datetime(2025, 6, 26)
+    dates = pd.date_range(june_26, june_26, freq='B')
+    n_s = 3
+    tn = 1  # q_1
+
+    # Formatted once per index (vectorised) and reused by the report lines below
+    date_strs = dates.strftime('%Y-%m-%d').to_numpy()
+
+    out.append(f"📅 Input dates: {date_strs[0]}")
+    out.append(f"🔧 n_s: {n_s}")
+    out.append(f"📊 tn (relative period): {tn} (q_1)")
+
+    # Step 1: Add n_s business days forward
+    forward_dates = dates + n_s * dates.freq
+    forward_strs = forward_dates.strftime('%Y-%m-%d').to_numpy()
+    out.append(f"📈 Step 1 - Forward shift: {date_strs[0]} + {n_s} business days = {forward_strs[0]}")
+
+    # Step 2: Shift by tn quarters
+    final_dates = forward_dates.shift(tn, freq='QS')
+    final_strs = final_dates.strftime('%Y-%m-%d').to_numpy()
+    out.append(f"📊 Step 2 - Quarter shift: {forward_strs[0]} + {tn} quarters = {final_strs[0]}")
+
+    out.append(f"\n🎯 FINAL RESULT:")
+    out.append(f"   Original SpreadViewer for June 26 + q_1 = {final_strs[0]}")
+    out.append(f"   This represents Q4 2025 delivery")
+
+    out.append(f"\n🤔 WHY THE €32 vs €20 PRICE DIFFERENCE?")
+    out.append("=" * 45)
+    out.append("If both DataFetcher and SpreadViewer use q_1 for June 26,")
+    out.append("the price difference must come from:")
+    out.append("   1. Different n_s interpretation in data fetching")
+    out.append("   2. Different contract specifications")
+    out.append("   3. Different market data sources")
+    out.append("   4. Different calculation methods within same relative period")
+    out.append("   5. SpreadViewer internal bug in price calculation")
+
+    out.append(f"\n📊 WHAT OUR MODIFICATIONS DID:")
+    out.append("=" * 35)
+    out.append("We replaced this original logic with:")
+    out.append("   • Period splitting (June 24-26 = q_2, June 27+ = q_1)")
+    out.append("   • Custom transition logic")
+    out.append("   • Hardcoded transition dates")
+
+    out.append(f"\nBut this created the €8.69 problem because now SpreadViewer")
+    out.append(f"might be fetching q_3 or q_4 instead of the intended period.")
+
+    out.append(f"\n🚨 RECOMMENDATION:")
+    out.append("=" * 20)
+    out.append("1. REVERT to original SpreadViewer logic")
+    out.append("2. Keep the original (dates + n_s * dates.freq).shift(tn, freq='QS')")
+    out.append("3. Focus on fixing the ACTUAL bug causing €32 vs €20 for same q_1")
+    out.append("4. Don't change relative period mappings - fix the calculation within same period")
+
+    sys.stdout.write('\n'.join(out) + '\n')
+
+
+if __name__ == '__main__':
+    main()
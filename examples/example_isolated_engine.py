@@ -13,7 +13,7 @@ import sys
 import os
 from datetime import datetime
 
-# Add current directory to path for imports
+# Add project root to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
@@ -0,0 +1,44 @@
+"""
+Test suite for data_fetcher contract parsing
+
+Tests absolute contract parsing and delivery date lookup.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from data_fetcher.contracts import _delivery_date, parse_absolute_contract
+
+
+class TestParseAbsoluteContract:
+    """Test absolute contract string parsing"""
+
+    def test_two_letter_market(self):
+        """Market, product, tenor and delivery date are decoded"""
+        spec = parse_absolute_contract('debq4_25')
+
+        assert (spec.market, spec.product, spec.tenor, spec.contract) == ('de', 'base', 'q', '4_25')
+        assert spec.delivery_date == datetime(2025, 10, 1)
+
+    def test_three_letter_market(self):
+        """Known 3-letter market codes are recognised"""
+        spec = parse_absolute_contract('ttfpm09_25')
+
+        assert (spec.market, spec.product, spec.tenor) == ('ttf', 'peak', 'm')
+        assert spec.delivery_date == datetime(2025, 9, 1)
+
+    def test_unknown_product(self):
+        """Unknown product codes are rejected"""
+        with pytest.raises(ValueError):
+            parse_absolute_contract('dexm07_25')
+
+    def test_delivery_date_cached(self):
+        """Repeated contracts reuse the cached delivery date, specs stay distinct"""
+        _delivery_date.cache_clear()
+
+        first = parse_absolute_contract('frbq4_25')
+        second = parse_absolute_contract('frbq4_25')
+
+        assert _delivery_date.cache_info().hits == 1
+        assert first == second and first is not second
@@ -0,0 +1,197 @@
+"""
+Test suite for data_fetcher transformation components
+
+Tests target-format conversion of order/trade data and price outlier filtering.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_fetcher.data_transformers import (
+    _rolling_mean_std,
+    _rolling_mean_std_pandas,
+    transform_orders_to_target_format,
+    transform_trades_to_target_format,
+    drop_duplicate_records,
+    downcast_for_storage,
+    detect_price_outliers
+)
+
+TARGET_COLUMNS = ['price', 'volume', 'action', 'broker_id', 'count', 'tradeid', 'b_price', 'a_price', '0']
+
+
+class TestTransformOrders:
+    """Test order data transformation"""
+
+    def test_empty_input(self):
+        """Empty input returns empty frame"""
+        assert transform_orders_to_target_format(pd.DataFrame(), 'datafetcher').empty
+
+    def test_datafetcher_orders(self):
+        """Target columns, NaN trade fields and mid-price"""
+        idx = pd.date_range('2025-06-02 09:00', periods=3, freq='min')
+        orders = pd.DataFrame({'b_price': [10.0, 11.0, np.nan], 'a_price': [12.0, 13.0, 14.0]}, index=idx)
+
+        result = transform_orders_to_target_format(orders, 'datafetcher')
+
+        assert list(result.columns) == TARGET_COLUMNS
+        assert result.index.equals(idx)
+        assert result['price'].isna().all()
+        assert result['0'].iloc[0] == 11.0
+        assert np.isnan(result['0'].iloc[2])
+
+    def test_spreadviewer_orders_renamed(self):
+        """SpreadViewer bid/ask columns are mapped to b_price/a_price"""
+        idx = pd.date_range('2025-06-02 09:00', periods=2, freq='min')
+        orders = pd.DataFrame({'bid': [1.0, 2.0], 'ask': [3.0, 4.0]}, index=idx)
+
+        result = transform_orders_to_target_format(orders, 'spreadviewer')
+
+        assert result['b_price'].tolist() == [1.0, 2.0]
+        assert result['a_price'].tolist() == [3.0, 4.0]
+        assert result['0'].tolist() == [2.0, 3.0]
+
+
+class TestTransformTrades:
+    """Test trade data transformation"""
+
+    def test_datafetcher_trades(self):
+        """DataFetcher trades keep their fields and get NaN bid/ask"""
+        idx = pd.date_range('2025-06-02 09:00', periods=2, freq='min')
+        trades = pd.DataFrame({'price': [5.0, 6.0], 'volume': [1, 2], 'broker_id': [1441, 1441]}, index=idx)
+
+        result = transform_trades_to_target_format(trades, 'datafetcher')
+
+        assert list(result.columns) == TARGET_COLUMNS
+        assert result['0'].tolist() == [5.0, 6.0]
+        assert result['action'].isna().all()
+        assert result[['b_price', 'a_price']].isna().all().all()
+
+    def test_spreadviewer_trades(self):
+        """SpreadViewer buy/sell columns become synthetic trades"""
+        idx = pd.date_range('2025-06-02 09:00', periods=3, freq='min')
+        trades = pd.DataFrame({'buy': [1.0, np.nan, 3.0], 'sell': [np.nan, 2.0, np.nan]}, index=idx)
+
+        result = transform_trades_to_target_format(trades, 'spreadviewer')
+
+        assert list(result.columns) == TARGET_COLUMNS
+        assert len(result) == 3
+        assert (result['broker_id'] == 9999).all()
+        assert sorted(result['action'].tolist()) == [-1.0, 1.0, 1.0]
+
+    def test_spreadviewer_without_trades(self):
+        """No buy/sell prices yields an empty frame with target columns"""
+        idx = pd.date_range('2025-06-02 09:00', periods=2, freq='min')
+        trades = pd.DataFrame({'buy': [np.nan, np.nan]}, index=idx)
+
+        result = transform_trades_to_target_format(trades, 'spreadviewer')
+
+        assert result.empty
+        assert list(result.columns) == TARGET_COLUMNS
+
+
+class TestDropDuplicateRecords:
+    """Test exact duplicate record removal"""
+
+    def test_only_exact_duplicates_dropped(self):
+        """Same timestamp and values is a duplicate; same values elsewhere is not"""
+        idx = pd.DatetimeIndex(['2025-06-02 09:00', '2025-06-02 09:00', '2025-06-02 09:00', '2025-06-02 09:01'])
+        trades = pd.DataFrame({'buy': [10.0, 10.0, 10.5, 10.0]}, index=idx)
+
+        result = drop_duplicate_records(trades)
+
+        assert result['buy'].tolist() == [10.0, 10.5, 10.0]
+        assert list(result.index) == [idx[0], idx[2], idx[3]]
+
+    def test_unique_index_returned_as_is(self):
+        """No repeated timestamps skips the comparison entirely"""
+        trades = pd.DataFrame({'buy': [1.0, 1.0]}, index=pd.date_range('2025-06-02', periods=2, freq='min'))
+
+        assert drop_duplicate_records(trades) is trades
+
+
+class TestDowncastForStorage:
+    """Test lossless dtype narrowing before writing unified data"""
+
+    def test_count_columns_narrowed_prices_kept(self):
+        """Integral count/id columns become 32-bit, prices stay float64"""
+        frame = pd.DataFrame({'price': [10.1, np.nan], 'volume': [5.0, np.nan],
+                              'broker_id': np.array([1441, 9999], dtype=np.int64),
+                              'action': [1.0, -1.0]})
+
+        result = downcast_for_storage(frame)
+
+        assert result['price'].dtype == np.float64
+        assert result['volume'].dtype == np.float32
+        assert result['action'].dtype == np.float32
+        assert result['broker_id'].dtype == np.int16
+        pd.testing.assert_frame_equal(result.astype(np.float64), frame.astype(np.float64))
+
+    def test_lossy_column_unchanged(self):
+        """Values that do not round-trip through float32 keep their dtype"""
+        frame = pd.DataFrame({'volume': [0.1, 2.0]})
+
+        assert downcast_for_storage(frame) is frame
+
+
+@pytest.mark.parametrize('rolling_mean_std', [_rolling_mean_std, _rolling_mean_std_pandas])
+class TestRollingMeanStd:
+    """Test the rolling mean/std kernel and its pandas fallback"""
+
+    def test_matches_pandas_rolling(self, rolling_mean_std):
+        """Kernel agrees with pandas rolling mean/std including NaN handling"""
+        values = np.random.default_rng(0).normal(0.5, 3.0, 500)
+        values[0] = np.nan
+        values[100:104] = np.nan
+
+        mean, std = rolling_mean_std(values, 50, 5)
+        rolling = pd.Series(values).rolling(50, min_periods=5)
+
+        np.testing.assert_allclose(mean, rolling.mean().to_numpy(), atol=1e-12)
+        np.testing.assert_allclose(std, rolling.std().to_numpy(), atol=1e-12)
+
+    def test_constant_series_has_zero_std(self, rolling_mean_std):
+        """Round-off never produces negative variance"""
+        mean, std = rolling_mean_std(np.full(20, 0.1), 5, 2)
+
+        assert np.all(std[1:] >= 0.0)
+        np.testing.assert_allclose(mean[1:], 0.1)
+
+    def test_window_shorter_than_min_periods(self, rolling_mean_std):
+        """A window that can never reach min_periods yields only NaN"""
+        mean, std = rolling_mean_std(np.arange(3.0), 3, 5)
+
+        assert np.isnan(mean).all() and np.isnan(std).all()
+
+
+class TestDetectPriceOutliers:
+    """Test rolling z-score outlier filtering"""
+
+    def test_removes_price_spike(self):
+        """Single large jump is removed, normal trades are kept"""
+        idx = pd.date_range('2025-06-02 09:00', periods=40, freq='min')
+        prices = 100 + np.random.default_rng(1).normal(0, 0.05, 40).cumsum()
+        prices[25] *= 1.2
+        trades = pd.DataFrame({'price': prices}, index=idx)
+
+        result = detect_price_outliers(trades, max_pct_change=8.0)
+
+        assert idx[25] not in result.index
+        assert len(result) >= 38
+
+    def test_insufficient_prices_returned_unchanged(self):
+        """Fewer than two valid prices skips detection"""
+        idx = pd.date_range('2025-06-02 09:00', periods=3, freq='min')
+        trades = pd.DataFrame({'price': [np.nan, 10.0, -1.0]}, index=idx)
+
+        assert detect_price_outliers(trades) is trades
+
+    def test_short_series(self):
+        """Series shorter than the z-score warm-up only applies the hard limit"""
+        idx = pd.date_range('2025-06-02 09:00', periods=3, freq='min')
+        trades = pd.DataFrame({'price': [10.0, 10.1, 20.0]}, index=idx)
+
+        result = detect_price_outliers(trades, max_pct_change=8.0)
+
+        assert list(result.index) == list(idx[:2])
@@ -0,0 +1,133 @@
+"""
+Test suite for data_fetcher date utilities
+
+Tests business day calculations, n_s transition periods and relative period mapping.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from data_fetcher.contracts import ContractSpec
+from data_fetcher.date_utils import (
+    calculate_last_business_day,
+    calculate_transition_dates,
+    convert_absolute_to_relative_periods,
+    calculate_synchronized_product_dates,
+    _synchronized_product_dates
+)
+
+
+class TestBusinessDays:
+    """Test last business day and transition date calculation"""
+
+    def test_last_business_day(self):
+        """Weekend month ends roll back to Friday"""
+        assert calculate_last_business_day(2025, 5) == datetime(2025, 5, 30)  # Sat 31st
+        assert calculate_last_business_day(2025, 6) == datetime(2025, 6, 30)  # Monday
+        assert calculate_last_business_day(2024, 12) == datetime(2024, 12, 31)
+
+    def test_transition_dates_single_month(self):
+        """Month splits into early period and last n_s business days"""
+        periods = calculate_transition_dates(datetime(2025, 6, 1), datetime(2025, 6, 30), n_s=3)
+
+        assert periods == [
+            (datetime(2025, 6, 1), datetime(2025, 6, 25), False),
+            (datetime(2025, 6, 26), datetime(2025, 6, 30), True)
+        ]
+
+    def test_transition_dates_span_months(self):
+        """Consecutive months each contribute early and transition periods"""
+        periods = calculate_transition_dates(datetime(2025, 5, 15), datetime(2025, 6, 10), n_s=2)
+
+        assert periods == [
+            (datetime(2025, 5, 15), datetime(2025, 5, 28), False),
+            (datetime(2025, 5, 29), datetime(2025, 5, 31), True),
+            (datetime(2025, 6, 1), datetime(2025, 6, 10), False)
+        ]
+
+
+class TestRelativePeriods:
+    """Test absolute to relative period conversion"""
+
+    def test_quarterly_outside_transition(self):
+        """Mid-quarter range maps to a single relative offset"""
+        spec = ContractSpec('de', 'base', 'q', '4_25', datetime(2025, 10, 1))
+
+        periods = convert_absolute_to_relative_periods(spec, datetime(2025, 5, 5), datetime(2025, 5, 9), n_s=3)
+
+        assert [(p.relative_offset, start, end) for p, start, end in periods] == [
+            (2, datetime(2025, 5, 5), datetime(2025, 5, 9))
+        ]
+
+    def test_quarterly_in_transition_rolls_year(self):
+        """Q4 transition window uses next year's Q1 perspective"""
+        spec = ContractSpec('de', 'base', 'q', '2_26', datetime(2026, 4, 1))
+
+        periods = convert_absolute_to_relative_periods(spec, datetime(2025, 12, 29), datetime(2025, 12, 31), n_s=3)
+
+        assert [p.relative_offset for p, _, _ in periods] == [1]
+
+    def test_monthly_periods(self):
+        """Monthly contract switches offset in the transition window"""
+        spec = ContractSpec('de', 'base', 'm', '08_25', datetime(2025, 8, 1))
+
+        periods = convert_absolute_to_relative_periods(spec, datetime(2025, 6, 1), datetime(2025, 6, 30), n_s=3)
+
+        assert [(p.relative_offset, start) for p, start, _ in periods] == [
+            (2, datetime(2025, 6, 1)),
+            (1, datetime(2025, 6, 26))
+        ]
+
+
+class TestSynchronizedProductDates:
+    """Test n_s synchronized product date calculation"""
+
+    def test_quarterly_shift(self):
+        """Dates near quarter end roll into the following quarter"""
+        dates = pd.date_range('2025-06-24', '2025-06-27', freq='B')
+
+        result = calculate_synchronized_product_dates(dates, ['q'], [1], n_s=3)
+
+        assert list(result[0]) == [
+            pd.Timestamp('2025-07-01'), pd.Timestamp('2025-07-01'),
+            pd.Timestamp('2025-10-01'), pd.Timestamp('2025-10-01')
+        ]
+
+    def test_non_positive_period_skipped(self):
+        """Relative period 0 yields an empty index"""
+        dates = pd.date_range('2025-06-02', '2025-06-06', freq='B')
+
+        result = calculate_synchronized_product_dates(dates, ['m'], [0], n_s=3)
+
+        assert len(result[0]) == 0
+
+    def test_repeated_inputs_hit_cache(self):
+        """An equal date range with the same tenors reuses the cached result"""
+        _synchronized_product_dates.cache_clear()
+
+        first = calculate_synchronized_product_dates(
+            pd.date_range('2025-06-24', '2025-06-27', freq='B'), ['q', 'q'], [1, 2], n_s=3)
+        second = calculate_synchronized_product_dates(
+            pd.date_range('2025-06-24', '2025-06-27', freq='B'), ['q', 'q'], [1, 2], n_s=3)
+
+        assert _synchronized_product_dates.cache_info().hits == 1
+        assert second[1] is first[1]
+        assert second is not first
+
+    def test_freq_less_index(self):
+        """Daily tenors keep the raw dates, standard tenors use the business-day range"""
+        dates = pd.DatetimeIndex(['2025-06-02', '2025-06-04'])
+        assert dates.freq is None
+
+        daily, quarterly = calculate_synchronized_product_dates(dates, ['da', 'q'], [1, 1], n_s=3)
+
+        assert daily.strftime('%Y-%m-%d').tolist() == ['2025-06-03', '2025-06-05']
+        assert len(quarterly) == 3
+        assert quarterly[0] == pd.Timestamp('2025-07-01')
+
+    def test_freq_less_index_seasonal_raises(self):
+        """Seasonal tenors need a business-day freq to apply the n_s shift"""
+        with pytest.raises(ValueError, match='freq'):
+            calculate_synchronized_product_dates(pd.DatetimeIndex(['2025-06-02', '2025-06-04']), ['sum'], [1])
@@ -0,0 +1,86 @@
+"""
+Test suite for data_fetcher merging components
+
+Tests the unified real/synthetic merge pipeline and single-source unification.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher.data_transformers import TARGET_COLUMNS
+from data_fetcher.merger import (
+    format_spread_data,
+    merge_spread_data,
+    create_unified_real_spread_data,
+    create_unified_spreadviewer_data
+)
+
+
+def _orders(times, bids, asks, source='datafetcher'):
+    """Build raw order frames in DataFetcher or SpreadViewer layout"""
+    columns = ('b_price', 'a_price') if source == 'datafetcher' else ('bid', 'ask')
+    return pd.DataFrame({columns[0]: bids, columns[1]: asks}, index=pd.DatetimeIndex(times))
+
+
+class TestMergeSpreadData:
+    """Test the unified real + synthetic merge"""
+
+    def test_best_bid_ask_selection(self):
+        """Highest bid and lowest ask win across sources, NaN sides are ignored"""
+        real = {'spread_orders': _orders(['2025-06-02 09:00', '2025-06-02 09:02'], [10.0, np.nan], [12.0, 12.5])}
+        synthetic = {'spread_orders': _orders(['2025-06-02 09:01'], [10.5], [11.5], source='spreadviewer')}
+
+        unified = merge_spread_data(real, synthetic)['unified_spread_data']
+
+        assert list(unified.columns) == TARGET_COLUMNS
+        assert unified['b_price'].tolist() == [10.0, 10.5, 10.5]
+        assert unified['a_price'].tolist() == [12.0, 11.5, 11.5]
+        assert unified['0'].tolist() == [11.0, 11.0, 11.0]
+
+    def test_empty_inputs(self):
+        """No data yields an empty frame with target columns"""
+        result = merge_spread_data({}, {})
+
+        assert result['unified_spread_data'].empty
+        assert list(result['unified_spread_data'].columns) == TARGET_COLUMNS
+        assert result['source_stats']['unified_total'] == 0
+
+
+class TestUnifiedSingleSource:
+    """Test single-source unification helpers"""
+
+    def test_real_trades_and_orders_sorted(self):
+        """Trades and orders are interleaved by timestamp"""
+        trades = pd.DataFrame({'price': [11.0], 'volume': [5]}, index=pd.DatetimeIndex(['2025-06-02 09:01']))
+        data = {'spread_orders': _orders(['2025-06-02 09:00', '2025-06-02 09:02'], [10.0, 10.2], [12.0, 12.2]),
+                'spread_trades': trades}
+
+        unified = create_unified_real_spread_data(data)['unified_spread_data']
+
+        assert unified.index.is_monotonic_increasing
+        assert unified['0'].tolist() == [11.0, 11.0, 11.2]
+
+    def test_spreadviewer_empty(self):
+        """Empty SpreadViewer data yields an empty frame with target columns"""
+        unified = create_unified_spreadviewer_data({})['unified_spread_data']
+
+        assert unified.empty
+        assert list(unified.columns) == TARGET_COLUMNS
+
+
+class TestFormattedFrames:
+    """Test passing pre-formatted frames to the merger entry points"""
+
+    def test_formatted_frames_match_raw(self):
+        """Pre-formatted frames give the same unified output as raw inputs"""
+        real = {'spread_orders': _orders(['2025-06-02 09:00', '2025-06-02 09:02'], [10.0, 10.2], [12.0, 12.2])}
+        synthetic = {'spread_orders': _orders(['2025-06-02 09:01'], [10.5], [11.5], source='spreadviewer')}
+        real_formatted = format_spread_data(real, 'datafetcher')
+        synthetic_formatted = format_spread_data(synthetic, 'spreadviewer')
+
+        merged = merge_spread_data(real, synthetic, real_formatted=real_formatted,
+                                   synthetic_formatted=synthetic_formatted)['unified_spread_data']
+        unified_real = create_unified_real_spread_data(real, formatted=real_formatted)['unified_spread_data']
+
+        pd.testing.assert_frame_equal(merged, merge_spread_data(real, synthetic)['unified_spread_data'])
+        pd.testing.assert_frame_equal(unified_real, create_unified_real_spread_data(real)['unified_spread_data'])
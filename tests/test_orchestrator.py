@@ -0,0 +1,48 @@
+"""
+Test suite for data_fetcher orchestration helpers
+
+Tests the database-free pieces: DataFetcher pooling and connection cleanup.
+"""
+
+from data_fetcher import orchestrator
+from data_fetcher.orchestrator import DataFetchOrchestrator
+
+
+class _FakeConnection:
+    """TPData stand-in recording disconnects"""
+
+    def __init__(self):
+        self.connected = True
+
+    def disconnect_from_database(self):
+        self.connected = False
+
+
+class _FakeDataFetcher:
+    """DataFetcher stand-in holding TPData-like connections"""
+
+    def __init__(self, allowed_broker_ids=None):
+        self.data_class_oracle = _FakeConnection()
+        self.data_class_pg = _FakeConnection()
+        self.data_class_da = None
+
+
+class TestFetcherPool:
+    """Test DataFetcher reuse and shutdown"""
+
+    def test_pooled_fetchers_disconnected_on_exit(self, monkeypatch, tmp_path):
+        """Borrowed fetchers are reused and their connections closed when the orchestrator exits"""
+        monkeypatch.setattr(orchestrator, 'TPDATA_AVAILABLE', True)
+        monkeypatch.setattr(orchestrator, 'DataFetcher', _FakeDataFetcher)
+
+        with DataFetchOrchestrator(output_base=str(tmp_path)) as fetch_orchestrator:
+            with fetch_orchestrator._borrow_fetcher() as first:
+                with fetch_orchestrator._borrow_fetcher() as second:
+                    pass
+            with fetch_orchestrator._borrow_fetcher() as reused:
+                assert reused in (first, second)
+
+        connections = [first.data_class_oracle, first.data_class_pg,
+                       second.data_class_oracle, second.data_class_pg]
+        assert not any(connection.connected for connection in connections)
+        assert fetch_orchestrator._fetcher_pool == []
@@ -0,0 +1,189 @@
+"""
+Test suite for data_fetcher SpreadViewer integration helpers
+
+Tests the database-free pieces: period configuration and synthetic trade adjustment.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_fetcher import spreadviewer_integration
+from data_fetcher.contracts import ContractSpec, RelativePeriod
+from data_fetcher.spreadviewer_integration import (
+    _TPDataPool,
+    adjust_trds_,
+    create_spreadviewer_config_for_period,
+    fetch_spreadviewer_for_period,
+    fetch_synthetic_spread_multiple_periods,
+    overlapping_periods
+)
+
+
+class TestSpreadViewerConfig:
+    """Test SpreadViewer configuration building"""
+
+    def test_config_for_period(self):
+        """Relative offsets and dates are mapped into the SpreadViewer config"""
+        contract1 = ContractSpec('de', 'base', 'm', '08_25', datetime(2025, 8, 1))
+        contract2 = ContractSpec('fr', 'base', 'm', '08_25', datetime(2025, 8, 1))
+
+        config = create_spreadviewer_config_for_period(
+            contract1, contract2, RelativePeriod(2, datetime(2025, 6, 2), datetime(2025, 6, 25)),
+            RelativePeriod(2, datetime(2025, 6, 2), datetime(2025, 6, 25)),
+            datetime(2025, 6, 2), datetime(2025, 6, 25), [1, -1], 3
+        )
+
+        assert config['markets'] == ['de', 'fr']
+        assert config['tn1_list'] == [2, 2]
+        assert (config['start_date'], config['end_date']) == ('2025-06-02', '2025-06-25')
+
+
+class TestTPDataPool:
+    """Test TPData handle reuse within one synthetic fetch"""
+
+    def test_handles_reused_and_closed(self, monkeypatch):
+        """Released handles are reused and every opened handle is closed on exit"""
+        closed = []
+
+        class FakeTPData:
+            def disconnect_from_database(self):
+                closed.append(self)
+
+        monkeypatch.setattr(spreadviewer_integration, 'TPData', FakeTPData, raising=False)
+
+        with _TPDataPool() as pool:
+            first = pool.acquire()
+            pool.release(first)
+            assert pool.acquire() is first
+            second = pool.acquire()
+
+        assert closed == [first, second]
+
+
+class _FailingTPData:
+    """TPData stand-in whose order query fails for July delivery products"""
+
+    def query_orders(self, product_dates):
+        if any(day.month == 7 for dates in product_dates for day in dates):
+            raise ConnectionError('TPData query failed')
+
+
+class _FakeSpreadViewerData:
+    """SpreadViewerData stand-in that only queries the TPData handle"""
+
+    def load_best_order_otc(self, markets, tenors, product_dates, db_class, **kwargs):
+        db_class.query_orders(product_dates)
+
+    def load_trades_otc(self, *args, **kwargs):
+        pass
+
+
+class _FakeSpreadSingle:
+    """SpreadSingle stand-in producing one spread quote and one trade per day"""
+
+    def __init__(self, markets, tenors, tn1_list, tn2_list, brokers):
+        self.tenors_list = tenors
+
+    def aggregate_data(self, data_class, d_range, n_s, **kwargs):
+        return {'day': d_range[0]}
+
+    def spread_maker(self, data_dict, coefficients, trade_type=None):
+        return pd.DataFrame({'bid': [1.0], 'ask': [2.0]}, index=[data_dict['day']])
+
+    def add_trades(self, data_dict, trade_dict, coefficients, flags):
+        return pd.DataFrame({'buy': [1.5], 'sell': [np.nan]}, index=[data_dict['day']])
+
+
+@pytest.fixture
+def fake_spreadviewer(monkeypatch):
+    """Run the real period fetch against SpreadViewer/TPData stand-ins"""
+    monkeypatch.setattr(spreadviewer_integration, 'SPREADVIEWER_AVAILABLE', True)
+    monkeypatch.setattr(spreadviewer_integration, 'TPData', _FailingTPData, raising=False)
+    monkeypatch.setattr(spreadviewer_integration, 'SpreadViewerData', _FakeSpreadViewerData, raising=False)
+    monkeypatch.setattr(spreadviewer_integration, 'SpreadSingle', _FakeSpreadSingle, raising=False)
+
+
+class TestMultiplePeriods:
+    """Test combining per-period SpreadViewer fetches"""
+
+    def test_failed_period_reported(self, fake_spreadviewer, monkeypatch):
+        """A failed period does not abort the batch and is listed in failed_periods"""
+        contract = ContractSpec('de', 'base', 'm', '08_25', datetime(2025, 8, 1))
+        periods = [(RelativePeriod(2, datetime(2025, 6, 2), datetime(2025, 6, 13)),
+                    datetime(2025, 6, 2), datetime(2025, 6, 13)),
+                   (RelativePeriod(1, datetime(2025, 6, 16), datetime(2025, 6, 20)),
+                    datetime(2025, 6, 16), datetime(2025, 6, 20))]
+        monkeypatch.setattr(spreadviewer_integration, 'convert_absolute_to_relative_periods',
+                            lambda *args: periods)
+
+        result = fetch_synthetic_spread_multiple_periods(contract, contract, datetime(2025, 6, 2),
+                                                         datetime(2025, 6, 20), [1, -1])
+
+        # Only the first period's 10 business days; the July-product period failed
+        assert len(result['spread_orders']) == 10
+        assert result['failed_periods'] == [
+            {'start_date': '2025-06-16', 'end_date': '2025-06-20', 'error': 'TPData query failed'}]
+
+    def test_tpdata_open_failure_settles(self, fake_spreadviewer, monkeypatch):
+        """An error opening the TPData handle is returned, not raised"""
+        def unavailable():
+            raise ConnectionError('TPData unavailable')
+
+        monkeypatch.setattr(spreadviewer_integration, 'TPData', unavailable)
+        config = {'markets': ['de', 'fr'], 'tenors': ['m', 'm'], 'tn1_list': [2, 2], 'coefficients': [1, -1],
+                  'start_date': '2025-06-02', 'end_date': '2025-06-06'}
+
+        result = fetch_spreadviewer_for_period(config)
+
+        assert result['error'] == 'TPData unavailable'
+        assert result['spread_orders'].empty and result['spread_trades'].empty
+
+
+class TestOverlappingPeriods:
+    """Test pairing of relative periods between two contracts"""
+
+    def test_matches_all_pairs_scan(self):
+        """Sweep yields the same overlaps as checking every pair, in date order"""
+        def ranges(bounds):
+            return [(RelativePeriod(k + 1, start, end), start, end)
+                    for k, (start, end) in enumerate(bounds)]
+
+        periods1 = ranges([(datetime(2025, 5, 1), datetime(2025, 5, 27)),
+                           (datetime(2025, 5, 28), datetime(2025, 6, 25)),
+                           (datetime(2025, 6, 26), datetime(2025, 6, 30))])
+        periods2 = ranges([(datetime(2025, 5, 1), datetime(2025, 6, 25)),
+                           (datetime(2025, 6, 26), datetime(2025, 6, 30))])
+
+        expected = [(p1, p2, max(s1, s2), min(e1, e2))
+                    for p1, s1, e1 in periods1 for p2, s2, e2 in periods2 if max(s1, s2) <= min(e1, e2)]
+
+        assert overlapping_periods(periods1[::-1], periods2) == expected
+        assert [(start.day, end.day) for _, _, start, end in expected] == [(1, 27), (28, 25), (26, 30)]
+
+
+class TestAdjustTrades:
+    """Test filtering of synthetic trades against the spread bid/ask"""
+
+    def test_trades_near_quotes_removed(self):
+        """Buys at the ask and sells at the bid (within buffer) are dropped"""
+        sm = pd.DataFrame({'bid': [10.0, np.nan], 'ask': [10.2, 10.3]},
+                          index=pd.DatetimeIndex(['2025-06-02 09:00', '2025-06-02 09:05']))
+        tr = pd.DataFrame({'buy': [10.2, 10.1, np.nan, 10.25], 'sell': [np.nan, np.nan, 10.0, np.nan]},
+                          index=pd.DatetimeIndex(['2025-06-02 09:01', '2025-06-02 09:02',
+                                                  '2025-06-02 09:02', '2025-06-02 09:06']))
+
+        result = adjust_trds_(tr, sm)
+
+        # 09:06 uses the forward-filled bid 10.0 and the new ask 10.3
+        assert list(result.index) == [pd.Timestamp('2025-06-02 09:02'), pd.Timestamp('2025-06-02 09:06')]
+        assert result['buy'].tolist() == [10.1, 10.25]
+
+    def test_trades_before_first_quote_kept(self):
+        """Trades with no prior spread quote are not filtered"""
+        sm = pd.DataFrame({'bid': [10.0], 'ask': [10.2]}, index=pd.DatetimeIndex(['2025-06-02 09:05']))
+        tr = pd.DataFrame({'buy': [10.2], 'sell': [np.nan]}, index=pd.DatetimeIndex(['2025-06-02 09:00']))
+
+        assert len(adjust_trds_(tr, sm)) == 1
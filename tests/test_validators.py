@@ -0,0 +1,112 @@
+"""
+Test suite for data_fetcher validation components
+
+Tests negative bid-ask spread filtering and validation statistics.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher.validators import BidAskValidator, _spread_check_kernel
+
+
+def _quotes(bids, asks):
+    """Build a minute-indexed frame with b_price/a_price columns"""
+    idx = pd.date_range('2025-06-02 09:00', periods=len(bids), freq='min')
+    return pd.DataFrame({'b_price': bids, 'a_price': asks}, index=idx)
+
+
+class TestBidAskValidator:
+    """Test negative spread detection and filtering"""
+
+    def test_negative_spreads_removed(self):
+        """Rows with ask < bid are dropped, one-sided quotes are kept"""
+        df = _quotes([10.0, 10.5, np.nan, 11.0], [10.2, 10.1, 9.0, 10.0])
+
+        result = BidAskValidator(log_filtered=False).validate_orders(df, 'Test')
+
+        assert list(result.index) == [df.index[0], df.index[2]]
+
+    def test_rows_sharing_timestamp_kept(self):
+        """Only the invalid row is dropped when other rows share its timestamp"""
+        idx = pd.DatetimeIndex(['2025-06-02 09:00', '2025-06-02 09:01', '2025-06-02 09:01'])
+        df = pd.DataFrame({'price': [np.nan, np.nan, 10.3], 'b_price': [10.0, 10.5, np.nan],
+                           'a_price': [10.2, 10.1, np.nan]}, index=idx)
+
+        result = BidAskValidator(log_filtered=False).validate_orders(df, 'Test')
+
+        assert result['price'].tolist()[1:] == [10.3]
+        assert list(result.index) == [idx[0], idx[2]]
+
+    def test_sample_logging(self, capsys):
+        """Offending rows are reported with bid, ask and spread"""
+        df = _quotes([10.0, 10.5], [10.2, 10.1])
+
+        BidAskValidator().validate_orders(df, 'Test')
+
+        out = capsys.readouterr().out
+        assert 'worst: -0.400' in out
+        assert f'{df.index[1]}: bid=10.500, ask=10.100, spread=-0.400' in out
+
+    def test_quiet_when_logging_disabled(self, capsys):
+        """log_filtered=False suppresses all output, including the removal summary"""
+        BidAskValidator(log_filtered=False).validate_orders(_quotes([10.5], [10.1]), 'Test')
+
+        assert capsys.readouterr().out == ''
+
+    def test_non_strict_marks_invalid(self):
+        """Non-strict mode keeps every row and flags the negative spreads"""
+        df = _quotes([10.0, 10.5], [10.2, 10.1])
+
+        result = BidAskValidator(strict_mode=False, log_filtered=False).validate_orders(df, 'Test')
+
+        assert len(result) == 2
+        assert result['is_valid'].iloc[1] == False  # noqa: E712
+
+    def test_stats_accumulate(self):
+        """Only rows with both prices count as processed"""
+        validator = BidAskValidator(log_filtered=False)
+        validator.validate_orders(_quotes([10.0, np.nan, 10.5], [10.2, 10.0, 10.1]), 'A')
+        validator.validate_orders(_quotes([1.0], [2.0]), 'B')
+
+        stats = validator.get_stats()
+
+        assert (stats['total_processed'], stats['filtered_count']) == (3, 1)
+        assert abs(stats['filter_rate'] - 100 / 3) < 1e-9
+
+    def test_stats_cached_until_counters_change(self):
+        """Repeated get_stats calls reuse the dict; new validations refresh it"""
+        validator = BidAskValidator(log_filtered=False)
+        validator.validate_orders(_quotes([10.5], [10.1]), 'A')
+        first = validator.get_stats()
+
+        assert validator.get_stats() is first
+
+        validator.validate_orders(_quotes([1.0], [2.0]), 'B')
+
+        assert validator.get_stats()['total_processed'] == 2
+
+    def test_missing_columns_returned_as_is(self):
+        """Frames without both price columns are not validated"""
+        df = pd.DataFrame({'price': [1.0]})
+
+        assert BidAskValidator(log_filtered=False).validate_orders(df, 'Test') is df
+
+
+class TestSpreadCheckKernel:
+    """Test the single-pass bid/ask kernel used for large frames"""
+
+    def test_matches_numpy_masks(self):
+        """Kernel mask and counts agree with the NumPy expressions"""
+        rng = np.random.default_rng(3)
+        bids = rng.normal(10.0, 1.0, 200)
+        asks = bids + rng.normal(0.2, 0.5, 200)
+        bids[::7] = np.nan
+        asks[::11] = np.nan
+        negative = np.empty(200, dtype=np.bool_)
+
+        valid_count, negative_count = _spread_check_kernel(bids, asks, negative)
+
+        both = ~(np.isnan(bids) | np.isnan(asks))
+        np.testing.assert_array_equal(negative, both & (asks < bids))
+        assert (valid_count, negative_count) == (both.sum(), (both & (asks < bids)).sum())